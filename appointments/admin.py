@@ -2,10 +2,11 @@
 from django.contrib import admin
 
 # Corrected imports for distributed models
-from .models import Appointment
+from .models import Appointment, SlotHold, OutboundEmail, StripeEvent
 from accounts.models import UserRole
 from providers.models import ProviderService, ServiceProvider, WorkingHours, BlockedSlot, ServiceLocation,ProviderTimeSlot
 from services.models import Service, ServiceCategory, ServiceSubCategory
+from providers import search
 
 
 @admin.register(UserRole)
@@ -37,11 +38,29 @@ class ServiceAdmin(admin.ModelAdmin):
 class AppointmentAdmin(admin.ModelAdmin):
     # Updated to reflect new Appointment model fields
     list_display = ('client', 'provider_service', 'date', 'status', 'booked_on')
-    list_filter = ('status', 'provider_service__sub_category__category', 'provider_service__provider__user')
+    list_filter = ('status', 'provider_service__sub_category__category', 'provider')
     search_fields = ('client__username', 'provider_service__name')
     date_hierarchy = 'date'
     raw_id_fields = ('client', 'provider_service')
 
+@admin.register(SlotHold)
+class SlotHoldAdmin(admin.ModelAdmin):
+    list_display = ('time_slot', 'appointment', 'expires_at', 'session_id')
+    list_filter = ('expires_at',)
+    raw_id_fields = ('time_slot', 'appointment')
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to', 'subject')
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'type', 'received_at', 'processed_at', 'last_error')
+    list_filter = ('type',)
+    search_fields = ('event_id',)
+
 @admin.register(ServiceProvider)
 class ServiceProviderAdmin(admin.ModelAdmin):
     list_display = ('user', 'location', 'phone_number', 'bio')
@@ -56,6 +75,12 @@ class ProviderServiceAdmin(admin.ModelAdmin):
     raw_id_fields = ('provider', 'sub_category')
     filter_horizontal = ('locations',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of icontains scans where there is one.
+        if search_term and search.is_supported():
+            return search.filter_matching(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
 @admin.register(WorkingHours)
 class WorkingHoursAdmin(admin.ModelAdmin):
     list_display = ('provider', 'day_of_week', 'start_time', 'end_time')
@@ -8,3 +8,5 @@ class AppointmentsConfig(AppConfig):
     def ready(self):
         # This is a critical step: import the signals file to register the receivers
         import appointments.signals
+        # SQLite tuning for every new database connection
+        import booking_system.db
@@ -0,0 +1,185 @@
+# appointments/booking.py
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from booking_system import metrics
+from providers.models import ProviderTimeSlot
+from providers import cache
+from .models import Appointment, SlotHold
+
+
+class SlotUnavailable(Exception):
+    """Raised when a time slot was claimed by someone else first."""
+
+
+class InvalidTransition(Exception):
+    """Raised when an appointment is no longer in the status an action expects."""
+
+
+def active_holds():
+    """Unexpired holds on the outer ProviderTimeSlot row, for use in Exists()."""
+    return SlotHold.objects.filter(time_slot=OuterRef('pk'), expires_at__gt=timezone.now())
+
+
+def book_appointment(client, provider_service, time_slot, location=None):
+    """
+    Claims a time slot and creates a pending appointment for it in one
+    transaction. The claim is a conditional UPDATE ... WHERE is_booked = false,
+    so when several clients race for the same slot exactly one update matches
+    and everyone else gets SlotUnavailable straight away instead of retrying.
+    """
+    with transaction.atomic():
+        claimed = ProviderTimeSlot.objects.filter(
+            pk=time_slot.pk,
+            provider_id=provider_service.provider_id,
+            is_booked=False,
+        ).exclude(Exists(active_holds())).update(is_booked=True)
+        if not claimed:
+            raise SlotUnavailable("This time slot is no longer available.")
+
+        appointment = Appointment.objects.create(
+            client=client,
+            provider_service=provider_service,
+            time_slot=time_slot,
+            location=location,
+            date=time_slot.date,
+        )
+        transaction.on_commit(lambda: metrics.record_transition(None, 'pending'))
+    return appointment
+
+
+def transition_appointment(appointment, from_statuses, to_status, release_slot=False):
+    """
+    Moves an appointment to `to_status` only if it is still in one of
+    `from_statuses` (compare-and-set), optionally freeing its time slot.
+    """
+    from_status = appointment.status
+    with transaction.atomic():
+        updated = Appointment.objects.filter(
+            pk=appointment.pk, status__in=from_statuses
+        ).update(status=to_status)
+        if not updated:
+            raise InvalidTransition("This appointment has already been updated.")
+        if release_slot:
+            ProviderTimeSlot.objects.filter(pk=appointment.time_slot_id).update(is_booked=False)
+        # queryset.update() skips post_save, so invalidate cached availability here.
+        transaction.on_commit(lambda: cache.invalidate(appointment.provider_id, appointment.date))
+        # The compare-and-set only matched if the loaded status was still current.
+        transaction.on_commit(lambda: metrics.record_transition(from_status, to_status))
+    appointment.status = to_status
+    return appointment
+
+
+def hold_slot(appointment, ttl_seconds=None):
+    """
+    Reserves the appointment's time slot for the length of a checkout.
+    Re-holding for the same appointment (double clicks, reloads) extends the
+    existing hold; a live hold for a different appointment raises SlotUnavailable.
+    """
+    ttl_seconds = ttl_seconds or settings.SLOT_HOLD_TTL_SECONDS
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+
+    with transaction.atomic():
+        SlotHold.objects.filter(time_slot_id=appointment.time_slot_id, expires_at__lte=now).delete()
+        hold, created = SlotHold.objects.get_or_create(
+            time_slot_id=appointment.time_slot_id,
+            defaults={'appointment': appointment, 'expires_at': expires_at},
+        )
+        if not created:
+            if hold.appointment_id != appointment.pk:
+                raise SlotUnavailable("This time slot is being checked out by someone else.")
+            hold.expires_at = expires_at
+            hold.save(update_fields=['expires_at'])
+    return hold
+
+
+async def ahold_slot(appointment, ttl_seconds=None):
+    # The async ORM has no transactions, so the hold runs in a worker thread.
+    return await sync_to_async(hold_slot)(appointment, ttl_seconds)
+
+
+def _open_sessions(appointment, min_remaining_seconds):
+    return SlotHold.objects.filter(
+        appointment=appointment,
+        time_slot_id=appointment.time_slot_id,
+        expires_at__gt=timezone.now() + timedelta(seconds=min_remaining_seconds),
+    ).exclude(session_id='').values_list('session_id', flat=True)
+
+
+def open_checkout_session(appointment, min_remaining_seconds=60):
+    """
+    The id of a Stripe checkout session already opened for this appointment
+    that stays valid for at least `min_remaining_seconds`, or None. The hold
+    and its session share one expiry, so the hold doubles as the session cache.
+    """
+    return _open_sessions(appointment, min_remaining_seconds).first()
+
+
+async def aopen_checkout_session(appointment, min_remaining_seconds=60):
+    return await _open_sessions(appointment, min_remaining_seconds).afirst()
+
+
+def release_holds(appointment_ids):
+    """Drops the holds for the given appointments, e.g. once payment settles."""
+    return SlotHold.objects.filter(appointment_id__in=appointment_ids).delete()[0]
+
+
+async def arelease_holds(appointment_ids):
+    return (await SlotHold.objects.filter(appointment_id__in=appointment_ids).adelete())[0]
+
+
+def invalidate_days(days):
+    """Drops cached availability for each (provider_id, day) in `days`."""
+    for provider_id, day in days:
+        cache.invalidate(provider_id, day)
+
+
+def expire_checkouts(appointment_ids, expired_sessions=()):
+    """
+    Gives up on the checkouts of `appointment_ids` that no longer have a live
+    hold (one whose session is in `expired_sessions` counts as dead). Each
+    appointment still 'approved' moves to 'failed' (compare-and-set), its slot
+    is freed and its day's cached availability dropped; the holds are deleted.
+    Returns how many appointments were released.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # A newer session for the same appointment keeps the checkout alive.
+        live = SlotHold.objects.filter(
+            appointment_id__in=appointment_ids, expires_at__gt=now,
+        ).exclude(session_id__in=list(expired_sessions)).values_list('appointment_id', flat=True)
+        ids = set(appointment_ids) - set(live)
+        abandoned = list(
+            Appointment.objects.select_for_update()
+            .filter(pk__in=ids, status='approved')
+            .values_list('pk', 'time_slot_id', 'provider_id', 'date')
+        )
+        if abandoned:
+            Appointment.objects.filter(pk__in=[row[0] for row in abandoned], status='approved').update(status='failed')
+            ProviderTimeSlot.objects.filter(pk__in=[row[1] for row in abandoned]).update(is_booked=False)
+            days = {(provider_id, day) for _, _, provider_id, day in abandoned}
+            # queryset.update() skips post_save, so invalidate cached availability here.
+            transaction.on_commit(lambda: invalidate_days(days))
+            transaction.on_commit(lambda: metrics.record_transition('approved', 'failed', len(abandoned)))
+        SlotHold.objects.filter(appointment_id__in=ids).delete()
+    return len(abandoned)
+
+
+def release_expired_holds(batch_size=1000):
+    """
+    Ends checkouts whose hold expired more than SLOT_HOLD_GRACE_SECONDS ago,
+    in batches of `batch_size`, through expire_checkouts(). Returns how many
+    holds were removed.
+    """
+    released = 0
+    cutoff = timezone.now() - timedelta(seconds=settings.SLOT_HOLD_GRACE_SECONDS)
+    while True:
+        ids = list(SlotHold.objects.filter(expires_at__lte=cutoff).values_list('appointment_id', flat=True)[:batch_size])
+        if not ids:
+            return released
+        expire_checkouts(ids)
+        released += len(ids)
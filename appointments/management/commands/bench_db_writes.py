@@ -0,0 +1,155 @@
+# appointments/management/commands/bench_db_writes.py
+import threading
+import time
+from datetime import date
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Exists
+from appointments.booking import SlotUnavailable, active_holds, book_appointment, transition_appointment
+from appointments.models import Appointment, OutboundEmail
+from providers.models import ProviderTimeSlot
+from .run_benchmarks import percentile
+
+# What Django does with SQLite when nothing is configured: rollback journal,
+# full fsync, deferred transactions and the sqlite3 module's 5 s busy timeout.
+STOCK_SQLITE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures booking write throughput on the configured database (see DB_PROFILE): writer threads "
+        "book a slot and reject it again, freeing the slot, while reader threads list open slots. "
+        "Everything the run writes is deleted afterwards. Use seed_bench to create a data set first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help="Threads booking appointments.")
+        parser.add_argument('--readers', type=int, default=4, help="Threads reading open slots.")
+        parser.add_argument('--seconds', type=float, default=5.0, help="Length of the run.")
+        parser.add_argument(
+            '--stock-sqlite', action='store_true',
+            help="Run with Django's default SQLite settings instead of the tuned profile, for comparison.",
+        )
+
+    def handle(self, *args, **options):
+        if options['writers'] <= 0 or options['readers'] < 0 or options['seconds'] <= 0:
+            raise CommandError("--writers and --seconds must be positive and --readers not negative.")
+        if options['stock_sqlite'] and connection.vendor != 'sqlite':
+            raise CommandError("--stock-sqlite needs DB_PROFILE=sqlite.")
+
+        # One open slot per writer; rejecting with release_slot frees it again,
+        # so every writer books the same slot over and over.
+        slots = list(
+            ProviderTimeSlot.objects.filter(
+                date__gte=date.today(), is_booked=False, provider__service_offerings__isnull=False,
+            ).exclude(Exists(active_holds())).select_related('provider').distinct().order_by('date', 'pk')[:options['writers']]
+        )
+        client_id = Appointment.objects.values_list('client', flat=True).first()
+        if len(slots) < options['writers'] or client_id is None:
+            raise CommandError("Not enough open future slots or no appointments; run seed_bench first.")
+        client = get_user_model().objects.get(pk=client_id)
+        work = [(slot, slot.provider.service_offerings.order_by('pk').first(), client) for slot in slots]
+
+        previous = settings.SQLITE_PRAGMAS, dict(connection.settings_dict.get('OPTIONS', {}))
+        if options['stock_sqlite']:
+            # Every thread's connection shares this settings dict.
+            connections.close_all()
+            settings.SQLITE_PRAGMAS = STOCK_SQLITE_PRAGMAS
+            connection.settings_dict['OPTIONS'] = {}
+        created = []
+        last_email = OutboundEmail.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        try:
+            self.stdout.write(self._describe_profile())
+            result = self._run(work, created, options)
+        finally:
+            Appointment.objects.filter(pk__in=created).delete()
+            ProviderTimeSlot.objects.filter(pk__in=[slot.pk for slot in slots]).update(is_booked=False)
+            OutboundEmail.objects.filter(pk__gt=last_email).delete()
+            if options['stock_sqlite']:
+                connections.close_all()
+                settings.SQLITE_PRAGMAS = previous[0]
+                connection.settings_dict['OPTIONS'] = previous[1]
+
+        seconds = result['elapsed']
+        writes = sorted(result['writes'])
+        self.stdout.write(
+            f"{options['writers']} writers, {options['readers']} readers, {seconds:.1f} s\n"
+            f"bookings  {len(writes) / seconds:>8.1f}/s  p50 {percentile(writes, 0.50) * 1000 if writes else 0:>7.1f} ms  "
+            f"p95 {percentile(writes, 0.95) * 1000 if writes else 0:>7.1f} ms\n"
+            f"reads     {result['reads'] / seconds:>8.1f}/s\n"
+            f"lock errors {len(result['errors'])}, slot conflicts {result['conflicts']}"
+        )
+        for message in sorted(set(result['errors'])):
+            self.stdout.write(f"  {result['errors'].count(message)} x {message}")
+
+    def _describe_profile(self):
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                values = {}
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                    cursor.execute(f'PRAGMA {name}')
+                    values[name] = cursor.fetchone()[0]
+            mode = connection.settings_dict['OPTIONS'].get('transaction_mode', 'DEFERRED')
+            return f"sqlite: {', '.join(f'{k}={v}' for k, v in values.items())}, transaction_mode={mode}"
+        pool = connection.settings_dict['OPTIONS'].get('pool')
+        if pool:
+            return f"{connection.vendor}: connection pool {pool}"
+        return f"{connection.vendor}: CONN_MAX_AGE={connection.settings_dict['CONN_MAX_AGE']}"
+
+    def _run(self, work, created, options):
+        stop = threading.Event()
+        lock = threading.Lock()
+        result = {'writes': [], 'errors': [], 'conflicts': 0, 'reads': 0}
+        day = work[0][0].date
+
+        def writer(slot, provider_service, client):
+            appointment = None
+            try:
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        # A failed reject is retried, or the slot would stay booked.
+                        if appointment is None:
+                            appointment = book_appointment(client, provider_service, slot)
+                            created.append(appointment.pk)
+                        transition_appointment(appointment, ['pending'], 'rejected', release_slot=True)
+                        appointment = None
+                    except SlotUnavailable:
+                        with lock:
+                            result['conflicts'] += 1
+                        continue
+                    except OperationalError as e:
+                        result['errors'].append(str(e))
+                        continue
+                    result['writes'].append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+
+        def reader():
+            count = 0
+            try:
+                while not stop.is_set():
+                    try:
+                        list(ProviderTimeSlot.objects.filter(date=day, is_booked=False).values_list('pk', 'start_time'))
+                    except OperationalError as e:
+                        result['errors'].append(str(e))
+                        continue
+                    count += 1
+            finally:
+                connections.close_all()
+                with lock:
+                    result['reads'] += count
+
+        threads = [threading.Thread(target=writer, args=item) for item in work]
+        threads += [threading.Thread(target=reader) for _ in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        result['elapsed'] = time.perf_counter() - started
+        return result
@@ -0,0 +1,149 @@
+# appointments/management/commands/compare_wsgi_asgi.py
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from appointments.models import Appointment
+from providers import stripe_client
+from providers import fake_stripe
+from providers.models import ProviderTimeSlot
+from .run_benchmarks import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives the async JSON and Stripe endpoints with many concurrent clients through Django's WSGI "
+        "handler (a fixed pool of worker threads) and its ASGI handler (one event loop), and reports "
+        "throughput and latency for each. Stripe is replaced by a local fake with a configurable delay."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help="Requests per endpoint and handler.")
+        parser.add_argument('--concurrency', type=int, default=100, help="Concurrent clients.")
+        parser.add_argument('--threads', type=int, default=8, help="Worker threads of the WSGI server being modelled.")
+        parser.add_argument('--stripe-latency-ms', type=int, default=150, help="Delay of the fake Stripe API.")
+
+    def handle(self, *args, **options):
+        if options['requests'] <= 0 or options['concurrency'] <= 0 or options['threads'] <= 0:
+            raise CommandError("--requests, --concurrency and --threads must be positive.")
+
+        slot = ProviderTimeSlot.objects.filter(
+            date__gte=date.today(), is_booked=False, provider__service_offerings__isnull=False,
+        ).select_related('provider').order_by('date', 'pk').first()
+        client_id = Appointment.objects.values_list('client', flat=True).first()
+        if slot is None or client_id is None:
+            raise CommandError("No open future slots or no appointments; run seed_bench first.")
+        provider_service = slot.provider.service_offerings.select_related('sub_category').order_by('pk').first()
+
+        # The fake runs in its own process so its threads do not compete with
+        # the handlers for the GIL.
+        ready, child_end = multiprocessing.Pipe()
+        server = multiprocessing.get_context('spawn').Process(
+            target=fake_stripe.serve, args=(options['stripe_latency_ms'] / 1000, child_end), daemon=True,
+        )
+        server.start()
+        previous_base, previous_hosts = settings.STRIPE_API_BASE, settings.ALLOWED_HOSTS
+        settings.STRIPE_API_BASE = ready.recv()
+        # The async test client always sends Host: testserver.
+        settings.ALLOWED_HOSTS = [*previous_hosts, 'testserver']
+        stripe_client._client = None
+        try:
+            session_id = stripe_client.get_stripe_client().v1.checkout.sessions.create(
+                params={'mode': 'payment', 'success_url': 'http://localhost/'},
+            ).id
+            session_key = self._session_key(client_id)
+            endpoints = [
+                ('get_available_time_slots',
+                 f"{reverse('get_available_time_slots')}?provider_service_id={provider_service.pk}&date={slot.date}"),
+                ('get_subcategories', reverse('get_subcategories', args=[provider_service.sub_category.category_id])),
+                ('payment_success (Stripe)', f"{reverse('payment_success')}?session_id={session_id}"),
+            ]
+            self.stdout.write(
+                f"{options['requests']} requests per run, {options['concurrency']} concurrent clients, "
+                f"{options['threads']} WSGI threads, Stripe latency {options['stripe_latency_ms']} ms\n"
+            )
+            for name, url in endpoints:
+                wsgi = self._run_wsgi(url, session_key, options)
+                asgi = asyncio.run(self._run_asgi(url, session_key, options))
+                self.stdout.write(self._format(name, 'WSGI', wsgi))
+                self.stdout.write(self._format(name, 'ASGI', asgi))
+        finally:
+            settings.STRIPE_API_BASE, settings.ALLOWED_HOSTS = previous_base, previous_hosts
+            stripe_client._client = None
+            server.terminate()
+
+    def _session_key(self, user_id):
+        # One login shared by every simulated client, so sessions are not created while timing.
+        browser = Client()
+        browser.force_login(User.objects.get(pk=user_id))
+        return browser.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def _split(self, options):
+        requests, concurrency = options['requests'], min(options['concurrency'], options['requests'])
+        return [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+    def _run_wsgi(self, url, session_key, options):
+        # Client threads queue requests on a fixed pool, as a threaded WSGI server
+        # would; latency includes the wait for a free worker thread.
+        local = threading.local()
+        timings, errors = [], []
+
+        def serve():
+            if not hasattr(local, 'browser'):
+                local.browser = Client()
+                local.browser.cookies[settings.SESSION_COOKIE_NAME] = session_key
+            return local.browser.get(url).status_code
+
+        with ThreadPoolExecutor(options['threads']) as workers:
+            def client(count):
+                for _ in range(count):
+                    started = time.perf_counter()
+                    status = workers.submit(serve).result()
+                    timings.append(time.perf_counter() - started)
+                    if status >= 400:
+                        errors.append(status)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(len(self._split(options))) as clients:
+                list(clients.map(client, self._split(options)))
+            elapsed = time.perf_counter() - started
+        return self._summary(timings, errors, elapsed)
+
+    async def _run_asgi(self, url, session_key, options):
+        browser = AsyncClient()
+        browser.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        timings, errors = [], []
+
+        async def client(count):
+            for _ in range(count):
+                started = time.perf_counter()
+                response = await browser.get(url)
+                timings.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(count) for count in self._split(options)))
+        return self._summary(timings, errors, time.perf_counter() - started)
+
+    def _summary(self, timings, errors, elapsed):
+        timings.sort()
+        return {
+            'rps': len(timings) / elapsed,
+            'p50_ms': percentile(timings, 0.50) * 1000,
+            'p95_ms': percentile(timings, 0.95) * 1000,
+            'errors': len(errors),
+        }
+
+    def _format(self, name, handler, result):
+        return (
+            f"{name:<26} {handler}  {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.1f} ms  "
+            f"p95 {result['p95_ms']:>8.1f} ms  {result['errors']} errors"
+        )
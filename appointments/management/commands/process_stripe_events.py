@@ -0,0 +1,27 @@
+# appointments/management/commands/process_stripe_events.py
+import time
+from django.core.management.base import BaseCommand
+from appointments.payments import process_stripe_events
+
+
+class Command(BaseCommand):
+    help = "Applies stored Stripe webhook events to appointments in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Events applied per transaction.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new events instead of exiting.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = 0
+            while True:
+                handled = process_stripe_events(batch_size=options['batch_size'])
+                if not handled:
+                    break
+                processed += handled
+            if processed or not options['loop']:
+                self.stdout.write(f"Processed {processed} Stripe events.")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
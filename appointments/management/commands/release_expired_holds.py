@@ -0,0 +1,21 @@
+# appointments/management/commands/release_expired_holds.py
+from django.core.management.base import BaseCommand
+from appointments.booking import release_expired_holds
+from appointments.payments import process_stripe_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Releases the slots of checkouts whose hold has expired: the appointment is marked failed and "
+        "the slot freed. Pending Stripe events are applied first. Safe to run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Holds deleted per query.")
+
+    def handle(self, *args, **options):
+        # A completed payment still in the inbox must not be released as abandoned.
+        while process_stripe_events():
+            pass
+        released = release_expired_holds(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired slot holds."))
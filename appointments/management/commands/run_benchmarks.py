@@ -0,0 +1,159 @@
+# appointments/management/commands/run_benchmarks.py
+import json
+import platform
+import time
+from urllib.parse import urlencode
+from datetime import date
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from appointments.models import Appointment
+from providers import cache as availability_cache
+from providers.models import ProviderService, ProviderTimeSlot
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile; exact enough for a few dozen samples.
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the booking hot paths through the test client against the current database and reports "
+        "p50/p95 latency and query counts. Use seed_bench to create a data set first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help="Timed requests per case.")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per case before timing.")
+        parser.add_argument('--client', help="Client username (defaults to the one with the most appointments).")
+        parser.add_argument('--provider', help="Provider username (defaults to the one with the most appointments).")
+        parser.add_argument('--search', help="Search query to time (defaults to the first word of the most common service name).")
+        parser.add_argument('--cold-cache', action='store_true', help="Flush the availability cache before every request.")
+        parser.add_argument('--output', help="Write the results as JSON to this path.")
+        parser.add_argument('--compare', help="A previous --output file to show p50/p95 changes against.")
+
+    def handle(self, *args, **options):
+        if options['iterations'] <= 0:
+            raise CommandError("--iterations must be positive.")
+        cases = self._cases(options)
+
+        results = {}
+        for name, user, url in cases:
+            results[name] = self._measure(user, url, options)
+            self.stdout.write(self._format(name, results[name]))
+
+        report = {
+            'recorded_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'iterations': options['iterations'],
+            'cold_cache': options['cold_cache'],
+            'results': results,
+        }
+        if options['compare']:
+            self._compare(options['compare'], results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+
+    def _cases(self, options):
+        User = get_user_model()
+        client_user = self._user(User, options['client'], 'client')
+        provider_user = self._user(User, options['provider'], 'provider__user')
+        provider = provider_user.service_provider_profile
+
+        provider_service = ProviderService.objects.filter(provider=provider).order_by('pk').first()
+        slot_date = ProviderTimeSlot.objects.filter(
+            provider=provider, date__gte=date.today(), is_booked=False,
+        ).order_by('date').values_list('date', flat=True).first()
+        if provider_service is None or slot_date is None:
+            raise CommandError(f"{provider_user.username} has no services or no open future slots.")
+        subcategory_id = ProviderService.objects.values('sub_category').annotate(
+            n=Count('pk'),
+        ).order_by('-n').values_list('sub_category', flat=True).first()
+
+        query = options['search'] or ProviderService.objects.values('name').annotate(
+            n=Count('pk'),
+        ).order_by('-n').values_list('name', flat=True).first().split()[0]
+
+        slots_url = f"{reverse('get_available_time_slots')}?provider_service_id={provider_service.pk}&date={slot_date}"
+        return [
+            ('get_available_time_slots', client_user, slots_url),
+            ('provider_dashboard', provider_user, reverse('provider_dashboard')),
+            ('manage_appointments', provider_user, reverse('manage_appointments')),
+            ('client_appointments', client_user, reverse('client_appointments')),
+            ('select_provider_service', client_user, reverse('select_provider_service', args=[subcategory_id])),
+            ('search_services', client_user, f"{reverse('search_services')}?{urlencode({'q': query})}"),
+        ]
+
+    def _user(self, User, username, appointment_path):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"User '{username}' does not exist.")
+        busiest = Appointment.objects.values(appointment_path).annotate(
+            n=Count('pk'),
+        ).order_by('-n').values_list(appointment_path, flat=True).first()
+        if busiest is None:
+            raise CommandError("There are no appointments; run seed_bench first or pass --client and --provider.")
+        return User.objects.get(pk=busiest)
+
+    def _measure(self, user, url, options):
+        browser = Client(HTTP_HOST='localhost')
+        browser.force_login(user)
+        timings, query_counts = [], []
+        for i in range(options['warmup'] + options['iterations']):
+            if options['cold_cache']:
+                availability_cache.get_cache().clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = browser.get(url)
+                elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned HTTP {response.status_code}.")
+            if i >= options['warmup']:
+                timings.append(elapsed)
+                query_counts.append(len(queries))
+        timings.sort()
+        return {
+            'url': url,
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'min_ms': round(timings[0], 2),
+            'max_ms': round(timings[-1], 2),
+            'queries': max(query_counts),
+            'bytes': len(response.content),
+        }
+
+    def _format(self, name, result):
+        return (
+            f"{name:<26} p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+            f"{result['queries']:>3} queries  {result['bytes']:>8} bytes"
+        )
+
+    def _compare(self, path, results):
+        try:
+            with open(path, encoding='utf-8') as f:
+                previous = json.load(f)['results']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        self.stdout.write(f"\nChange against {path}:")
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            old = previous[name]
+            changes = [
+                f"{key} {(result[key] - old[key]) / old[key] * 100:+.0f}%" if old[key] else f"{key} n/a"
+                for key in ('p50_ms', 'p95_ms')
+            ]
+            changes.append(f"queries {result['queries'] - old['queries']:+d}")
+            self.stdout.write(f"{name:<26} " + '  '.join(changes))
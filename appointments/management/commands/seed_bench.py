@@ -0,0 +1,193 @@
+# appointments/management/commands/seed_bench.py
+import random
+import time
+from datetime import date, time as dt_time, timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.models import UserRole
+from appointments.models import Appointment
+from providers.models import BlockedSlot, ProviderService, ProviderTimeSlot
+from providers.transfer import Importer
+
+CATALOG = {
+    'Beauty': ['Facial', 'Manicure', 'Hair Styling'],
+    'Wellness': ['Massage', 'Yoga Session'],
+    'Fitness': ['Personal Training', 'Pilates'],
+    'Home Services': ['Cleaning', 'Plumbing'],
+}
+LOCATIONS = ['Mumbai', 'Goa', 'Delhi', 'Bengaluru', 'Pune', 'Online']
+ADJECTIVES = ['Basic', 'Express', 'Deluxe', 'Signature', 'Premium', 'Classic', 'Deep', 'Relaxing']
+
+# Status mix for booked slots; past and future appointments differ.
+PAST_STATUSES = (['completed'] * 6) + ['paid', 'rejected', 'failed']
+FUTURE_STATUSES = (['pending'] * 4) + (['approved'] * 3) + (['paid'] * 2) + ['rejected', 'failed']
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic data set for benchmarking: providers with services, working hours, "
+        "time slots and blocked slots over a date range, clients, and appointments in every status."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--providers', type=int, default=50, help="Number of service providers.")
+        parser.add_argument('--services-per-provider', type=int, default=4, help="ProviderService rows per provider.")
+        parser.add_argument('--clients', type=int, default=200, help="Number of client accounts.")
+        parser.add_argument('--days', type=int, default=60, help="Days of schedule from today onwards.")
+        parser.add_argument('--past-days', type=int, default=30, help="Days of schedule before today.")
+        parser.add_argument('--booked-ratio', type=float, default=0.35, help="Share of slots that get an appointment.")
+        parser.add_argument('--prefix', default='bench', help="Username prefix for generated accounts.")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed, so runs are reproducible.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk_create batch.")
+        parser.add_argument('--clear', action='store_true', help="Delete accounts with the prefix (and their data) first.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        existing = User.objects.filter(username__startswith=f'{prefix}_')
+        if options['clear']:
+            deleted, _ = existing.delete()
+            self.stdout.write(f"Deleted {deleted} existing rows.")
+        elif existing.exists():
+            raise CommandError(f"Accounts starting with '{prefix}_' already exist; pass --clear to replace them.")
+        if not 0 <= options['booked_ratio'] <= 1:
+            raise CommandError("--booked-ratio must be between 0 and 1.")
+        if not 1 <= options['services_per_provider'] <= len(ADJECTIVES) * sum(map(len, CATALOG.values())):
+            raise CommandError("--services-per-provider is out of range.")
+
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        today = date.today()
+        days = [today + timedelta(days=offset) for offset in range(-options['past_days'], options['days'])]
+        batch_size = options['batch_size']
+
+        importer = Importer(batch_size=batch_size)
+        provider_names = [f'{prefix}_provider_{i}' for i in range(options['providers'])]
+        subcategories = [(category, sub) for category, subs in CATALOG.items() for sub in subs]
+        service_locations = {}
+        bookings = {}
+        blocks = []
+
+        for username in provider_names:
+            importer.add(0, {
+                'type': 'provider', 'username': username, 'email': f'{username}@example.com',
+                'location': rng.choice(LOCATIONS),
+            })
+            # Names are distinct per provider, since the importer skips a provider's repeated names.
+            offerings = rng.sample(
+                [(adjective, category, subcategory) for adjective in ADJECTIVES for category, subcategory in subcategories],
+                options['services_per_provider'],
+            )
+            for adjective, category, subcategory in offerings:
+                name = f'{adjective} {subcategory}'
+                locations = rng.sample(LOCATIONS, rng.randint(1, 3))
+                service_locations.setdefault(username, []).append(locations)
+                importer.add(0, {
+                    'type': 'service', 'provider': username, 'category': category, 'subcategory': subcategory,
+                    'name': name, 'description': f'{name} session by a certified professional.',
+                    'duration_minutes': rng.choice([30, 45, 60, 90]), 'price': f'{rng.randint(10, 150)}.00',
+                    'locations': locations,
+                })
+
+            start_hour = rng.choice([8, 9, 10])
+            end_hour = start_hour + rng.choice([7, 8, 9])
+            working_days = sorted(rng.sample(range(7), rng.randint(5, 6)))
+            for day_of_week in working_days:
+                importer.add(0, {
+                    'type': 'working_hours', 'provider': username, 'day_of_week': day_of_week,
+                    'start_time': f'{start_hour:02}:00', 'end_time': f'{end_hour:02}:00',
+                })
+
+            for day in days:
+                if day.weekday() not in working_days:
+                    continue
+                blocked_hour = None
+                if rng.random() < 0.1:
+                    blocked_hour = rng.randrange(start_hour, end_hour)
+                    blocks.append((username, day, blocked_hour))
+                for hour in range(start_hour, end_hour):
+                    if hour == blocked_hour:
+                        continue
+                    status = None
+                    if rng.random() < options['booked_ratio']:
+                        status = rng.choice(PAST_STATUSES if day < today else FUTURE_STATUSES)
+                        bookings[(username, day, hour)] = status
+                    importer.add(0, {
+                        'type': 'slot', 'provider': username, 'date': day, 'start_time': dt_time(hour),
+                        'end_time': dt_time(hour, 50), 'is_booked': status not in (None, 'rejected'),
+                    })
+        importer.finish()
+
+        provider_ids = {username: importer.providers[username] for username in provider_names}
+        usernames = {pk: username for username, pk in provider_ids.items()}
+
+        with transaction.atomic():
+            BlockedSlot.objects.bulk_create([
+                BlockedSlot(provider_id=provider_ids[username], date=day, start_time=dt_time(hour),
+                            end_time=dt_time(hour, 50), reason='Personal time')
+                for username, day, hour in blocks
+            ], batch_size=batch_size)
+
+        clients = self._create_clients(prefix, options['clients'], batch_size)
+        appointments = self._create_appointments(rng, bookings, provider_ids, usernames, clients, importer, service_locations, batch_size)
+
+        elapsed = time.perf_counter() - started
+        written = importer.written
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {written['provider']} providers, {written['service']} services, "
+            f"{written['working_hours']} working hours, {written['slot']} time slots, {len(blocks)} blocked slots, "
+            f"{len(clients)} clients and {appointments} appointments in {elapsed:.1f}s."
+        ))
+
+    def _create_clients(self, prefix, count, batch_size):
+        users = []
+        for i in range(count):
+            user = User(username=f'{prefix}_client_{i}', email=f'{prefix}_client_{i}@example.com')
+            user.set_unusable_password()
+            users.append(user)
+        with transaction.atomic():
+            users = User.objects.bulk_create(users, batch_size=batch_size)
+            UserRole.objects.bulk_create([UserRole(user=user, role='client') for user in users], batch_size=batch_size)
+        return [user.pk for user in users]
+
+    def _create_appointments(self, rng, bookings, provider_ids, usernames, clients, importer, service_locations, batch_size):
+        if not clients or not bookings:
+            return 0
+        services = {}
+        for pk, provider_id in ProviderService.objects.filter(
+            provider_id__in=provider_ids.values(),
+        ).order_by('pk').values_list('pk', 'provider_id'):
+            services.setdefault(provider_id, []).append(pk)
+
+        created = 0
+        batch = []
+        slots = ProviderTimeSlot.objects.filter(provider_id__in=provider_ids.values()).values_list(
+            'pk', 'provider_id', 'date', 'start_time',
+        ).order_by('pk')
+        for slot_id, provider_id, day, start_time in slots.iterator(chunk_size=batch_size):
+            status = bookings.get((usernames[provider_id], day, start_time.hour))
+            if status is None:
+                continue
+            index = rng.randrange(len(services[provider_id]))
+            location_name = rng.choice(service_locations[usernames[provider_id]][index])
+            batch.append(Appointment(
+                client_id=rng.choice(clients),
+                provider_service_id=services[provider_id][index],
+                # bulk_create bypasses Appointment.save(), which normally fills this in.
+                provider_id=provider_id,
+                time_slot_id=slot_id,
+                location_id=importer.locations[location_name],
+                date=day,
+                status=status,
+            ))
+            if len(batch) >= batch_size:
+                created += self._flush_appointments(batch)
+                batch = []
+        if batch:
+            created += self._flush_appointments(batch)
+        return created
+
+    def _flush_appointments(self, batch):
+        with transaction.atomic():
+            Appointment.objects.bulk_create(batch)
+        return len(batch)
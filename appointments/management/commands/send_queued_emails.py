@@ -0,0 +1,23 @@
+# appointments/management/commands/send_queued_emails.py
+import time
+from django.core.management.base import BaseCommand
+from appointments.outbox import process_outbox
+
+
+class Command(BaseCommand):
+    help = "Delivers queued booking notification emails in batches with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="Emails sent per mail connection.")
+        parser.add_argument('--workers', type=int, default=4, help="Number of sending threads.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new emails instead of exiting.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = process_outbox(batch_size=options['batch_size'], workers=options['workers'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed.")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
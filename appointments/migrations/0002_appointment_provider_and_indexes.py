@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_provider(apps, schema_editor):
+    Appointment = apps.get_model('appointments', 'Appointment')
+    ProviderService = apps.get_model('providers', 'ProviderService')
+    Appointment.objects.update(
+        provider_id=models.Subquery(
+            ProviderService.objects.filter(pk=models.OuterRef('provider_service_id')).values('provider_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0001_initial'),
+        ('providers', '0005_providertimeslot_slot_provider_date_booked'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='provider',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='providers.serviceprovider'),
+        ),
+        migrations.RunPython(populate_provider, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='provider',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='providers.serviceprovider'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['provider', 'status', 'date'], name='appt_provider_status_date'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['provider', 'date', 'status'], name='appt_provider_date_status'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_appointment_provider_and_indexes'),
+        ('providers', '0005_providertimeslot_slot_provider_date_booked'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.CharField(blank=True, max_length=255)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='appointments.appointment')),
+                ('time_slot', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='hold', to='providers.providertimeslot')),
+            ],
+        ),
+    ]
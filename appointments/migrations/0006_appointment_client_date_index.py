@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_stripeevent'),
+        ('providers', '0006_providertimeslot_slot_booked_date_start'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['client', 'date', 'id'], name='appt_client_date_id'),
+        ),
+    ]
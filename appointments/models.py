@@ -2,13 +2,22 @@
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from providers.models import ProviderService, ProviderTimeSlot, ServiceLocation
+from providers.models import ServiceProvider, ProviderService, ProviderTimeSlot, ServiceLocation
 
 User = get_user_model()
 
+class AppointmentQuerySet(models.QuerySet):
+    def with_details(self):
+        # Everything the appointment list templates dereference per row.
+        return self.select_related(
+            'client', 'provider_service__provider__user', 'time_slot', 'location'
+        )
+
 class Appointment(models.Model):
     client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appointments')
     provider_service = models.ForeignKey(ProviderService, on_delete=models.CASCADE, related_name='appointments')
+    # Denormalized from provider_service.provider so provider views can filter without a join.
+    provider = models.ForeignKey(ServiceProvider, on_delete=models.CASCADE, related_name='appointments', editable=False)
     time_slot = models.ForeignKey(ProviderTimeSlot, on_delete=models.CASCADE, related_name='appointments')
     location = models.ForeignKey(ServiceLocation, on_delete=models.SET_NULL, null=True, related_name='appointments')
     date = models.DateField()
@@ -19,9 +28,96 @@ class Appointment(models.Model):
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
         ('paid', 'Paid'),
+        ('failed', 'Payment Failed'),
         ('completed', 'Completed'),
     )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    
+
+    objects = AppointmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['provider', 'status', 'date'], name='appt_provider_status_date'),
+            models.Index(fields=['provider', 'date', 'status'], name='appt_provider_date_status'),
+            models.Index(fields=['client', 'date', 'id'], name='appt_client_date_id'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep the denormalized provider in sync with the provider service.
+        # Note that bulk_create() and queryset.update() bypass this.
+        if self.provider_service_id:
+            self.provider_id = self.provider_service.provider_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Appointment for {self.provider_service.name} with {self.client.username}"
+
+
+class SlotHold(models.Model):
+    """
+    A time-limited reservation of a time slot while its appointment is in
+    Stripe checkout. When the checkout session expires (webhook) or the hold
+    lapses (release_expired_holds), the appointment is failed and its slot freed.
+    """
+    time_slot = models.OneToOneField(ProviderTimeSlot, on_delete=models.CASCADE, related_name='hold')
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='slot_holds')
+    session_id = models.CharField(max_length=255, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Hold on {self.time_slot} until {self.expires_at}"
+
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting to be delivered by the send_queued_emails worker, so that
+    SMTP latency and failures never reach the request that triggered it.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True, db_index=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_attempt'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to} ({self.get_status_display()})"
+
+
+class StripeEvent(models.Model):
+    """
+    Inbox of verified Stripe webhook events. The webhook view only inserts
+    here; process_stripe_events applies them in batches. The unique event_id
+    makes Stripe's retries and replays no-ops.
+    """
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # Why the event could not be applied; it is still marked processed.
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['processed_at', 'received_at'], name='stripe_event_unprocessed'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} ({self.event_id})"
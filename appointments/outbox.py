@@ -0,0 +1,134 @@
+# appointments/outbox.py
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# How long a worker owns a claimed batch before other workers may retry it.
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def queue_email(subject, body, to, html_body=''):
+    """
+    Queues an email for the outbox worker once the current transaction
+    commits, so rolled-back bookings never send confirmations.
+    """
+    if not to:
+        return
+    transaction.on_commit(lambda: OutboundEmail.objects.create(
+        to=to, subject=subject, body=body, html_body=html_body,
+    ))
+
+
+def claim_batch(batch_size):
+    """
+    Leases up to `batch_size` due emails to this worker. The conditional update
+    only matches rows no other worker leased in the meantime.
+    """
+    now = timezone.now()
+    ids = list(OutboundEmail.objects.filter(
+        status='pending', next_attempt_at__lte=now
+    ).order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    OutboundEmail.objects.filter(
+        pk__in=ids, status='pending', next_attempt_at__lte=now
+    ).update(claim_token=token, next_attempt_at=now + CLAIM_LEASE)
+    return list(OutboundEmail.objects.filter(claim_token=token, status='pending'))
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def _record_attempt(email, error=None):
+    email.attempts += 1
+    if error is None:
+        email.status = 'sent'
+        email.sent_at = timezone.now()
+        email.last_error = ''
+    else:
+        email.last_error = str(error) or error.__class__.__name__
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = 'failed'
+        else:
+            email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.claim_token = ''
+    email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'claim_token', 'last_error', 'sent_at'])
+
+
+def send_batch(batch_size=50):
+    """
+    Claims one batch and sends it over a single reused mail connection.
+    If the connection cannot be opened, every claimed email counts as a
+    failed attempt. Returns (sent, failed) counts.
+    """
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    mail_connection = get_connection()
+    try:
+        mail_connection.open()
+    except Exception as e:
+        # An unreachable SMTP server backs the whole batch off like a failed send.
+        for email in emails:
+            _record_attempt(email, e)
+        return 0, len(emails)
+
+    sent = failed = 0
+    try:
+        for email in emails:
+            message = EmailMultiAlternatives(
+                email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.to],
+                connection=mail_connection,
+            )
+            if email.html_body:
+                message.attach_alternative(email.html_body, 'text/html')
+            try:
+                message.send()
+            except Exception as e:
+                failed += 1
+                _record_attempt(email, e)
+            else:
+                sent += 1
+                _record_attempt(email)
+    finally:
+        mail_connection.close()
+    return sent, failed
+
+
+def _send_batch_in_thread(batch_size):
+    try:
+        return send_batch(batch_size)
+    except Exception:
+        # Claimed rows are retried once their lease runs out; keep the worker alive.
+        logger.exception("Sending an outbox batch failed")
+        return 0, 0
+    finally:
+        db_connection.close()
+
+
+def process_outbox(batch_size=50, workers=4):
+    """
+    Sends due emails with a pool of `workers` threads, each draining batches
+    over its own mail connection, until nothing is due. Returns (sent, failed).
+    """
+    total_sent = total_failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            results = list(pool.map(_send_batch_in_thread, [batch_size] * workers))
+            sent = sum(r[0] for r in results)
+            failed = sum(r[1] for r in results)
+            total_sent += sent
+            total_failed += failed
+            if not sent and not failed:
+                return total_sent, total_failed
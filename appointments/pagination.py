@@ -0,0 +1,76 @@
+# appointments/pagination.py
+import base64
+from datetime import date
+from django.db.models import Q
+from .models import Appointment
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+def encode_cursor(appointment):
+    raw = f'{appointment.date.isoformat()}:{appointment.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Returns (date, id) for a cursor token; raises ValueError if it is malformed."""
+    padded = token + '=' * (-len(token) % 4)
+    try:
+        day, pk = base64.urlsafe_b64decode(padded.encode()).decode().split(':')
+        return date.fromisoformat(day), int(pk)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor.') from e
+
+
+def page_size_from(params, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(params.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def statuses_from(params):
+    """Status filter from a comma-separated `status` parameter, ignoring unknown values."""
+    valid = {value for value, _ in Appointment.STATUS_CHOICES}
+    return [status for status in params.get('status', '').split(',') if status in valid]
+
+
+def keyset_page(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    One page of `queryset` ordered by (date, id), starting after `cursor`.
+    Seeks with a WHERE clause instead of OFFSET, so every page costs the same
+    no matter how deep into the history it is. Returns (rows, next_cursor).
+    """
+    queryset = queryset.order_by('date', 'id')
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(date__gt=after_date) | Q(date=after_date, id__gt=after_id))
+    rows = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
+
+
+def paginate(queryset, params, cursor_param='cursor'):
+    """
+    Applies the `status` filter and keyset pagination from request parameters.
+    Raises ValueError for a malformed cursor.
+    """
+    statuses = statuses_from(params)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return keyset_page(queryset, params.get(cursor_param), page_size_from(params))
+
+
+def serialize_appointment(appointment):
+    return {
+        'id': appointment.pk,
+        'date': appointment.date.isoformat(),
+        'start_time': appointment.time_slot.start_time.strftime('%H:%M'),
+        'status': appointment.status,
+        'provider_service': appointment.provider_service.name,
+        'provider': appointment.provider_service.provider.user.username,
+        'client': appointment.client.username,
+        'price': str(appointment.provider_service.price),
+    }
@@ -0,0 +1,144 @@
+# appointments/payments.py
+from collections import Counter
+from django.db import connection, transaction
+from django.utils import timezone
+from booking_system import metrics
+from providers.models import ProviderTimeSlot
+from .booking import expire_checkouts, invalidate_days, release_holds
+from .models import Appointment, StripeEvent
+
+# Events we act on; everything else is acknowledged and dropped.
+HANDLED_EVENT_TYPES = {
+    'checkout.session.completed',
+    'checkout.session.async_payment_succeeded',
+    'checkout.session.async_payment_failed',
+    'checkout.session.expired',
+}
+
+# Statuses a payment outcome may overwrite.
+FAILABLE_STATUSES = ('pending', 'approved')
+PAYABLE_STATUSES = ('pending', 'approved', 'failed')
+
+
+def record_event(event):
+    """
+    Stores a verified webhook event with a single INSERT. A duplicate event id
+    (Stripe retry or replay) is silently ignored by the unique constraint.
+    """
+    if event['type'] not in HANDLED_EVENT_TYPES:
+        return
+    StripeEvent.objects.bulk_create(
+        [StripeEvent(event_id=event['id'], type=event['type'], payload=event)],
+        ignore_conflicts=True,
+    )
+
+
+def _appointment_id(session):
+    # Sessions created elsewhere in the Stripe account may carry no metadata.
+    appointment_id = (session.get('metadata') or {}).get('appointment_id')
+    try:
+        return int(appointment_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _classify(event, paid, failed, expired):
+    # Raises on payloads that are not shaped like a checkout session event.
+    session = event.payload['data']['object']
+    appointment_id = _appointment_id(session)
+    if appointment_id is None:
+        return
+    if event.type == 'checkout.session.completed':
+        # Delayed payment methods complete unpaid and follow up with an async event.
+        if session.get('payment_status') == 'paid':
+            paid.add(appointment_id)
+    elif event.type == 'checkout.session.async_payment_succeeded':
+        paid.add(appointment_id)
+    elif event.type == 'checkout.session.async_payment_failed':
+        failed.add(appointment_id)
+    elif event.type == 'checkout.session.expired':
+        expired[appointment_id] = session.get('id')
+
+
+def _apply_payments(paid, failed):
+    """
+    Moves appointments to 'failed' or 'paid' with one conditional UPDATE per
+    target status. Failures are applied first, so a success in the same batch
+    wins. A failed appointment gives its slot back, as a rejected one does; a
+    payment arriving for one that had already failed must win the slot back,
+    or it stays failed.
+    """
+    if not paid and not failed:
+        return
+    # One locked read of the current rows, so the transition counts match
+    # what the UPDATEs below are about to do.
+    rows = {
+        pk: (status, time_slot_id, provider_id, day)
+        for pk, status, time_slot_id, provider_id, day in Appointment.objects.select_for_update().filter(
+            pk__in=paid | failed,
+        ).values_list('pk', 'status', 'time_slot_id', 'provider_id', 'date')
+    }
+    targets = {}
+    for pk in failed:
+        if pk in rows and rows[pk][0] in FAILABLE_STATUSES:
+            targets[pk] = 'failed'
+    for pk in paid:
+        if pk in rows and targets.get(pk, rows[pk][0]) in PAYABLE_STATUSES:
+            targets[pk] = 'paid'
+    for pk, target in list(targets.items()):
+        if target == 'paid' and rows[pk][0] == 'failed':
+            if not ProviderTimeSlot.objects.filter(pk=rows[pk][1], is_booked=False).update(is_booked=True):
+                del targets[pk]
+
+    now_failed = [pk for pk, target in targets.items() if target == 'failed']
+    now_paid = [pk for pk, target in targets.items() if target == 'paid']
+    Appointment.objects.filter(pk__in=now_failed, status__in=FAILABLE_STATUSES).update(status='failed')
+    Appointment.objects.filter(pk__in=now_paid, status__in=PAYABLE_STATUSES).update(status='paid')
+    ProviderTimeSlot.objects.filter(pk__in=[rows[pk][1] for pk in now_failed]).update(is_booked=False)
+
+    transitions = Counter((rows[pk][0], target) for pk, target in targets.items())
+    # queryset.update() skips post_save, so invalidate cached availability here.
+    days = {(rows[pk][2], rows[pk][3]) for pk in targets}
+    transaction.on_commit(lambda: invalidate_days(days))
+    transaction.on_commit(lambda: metrics.record_transitions(transitions))
+
+
+def process_stripe_events(batch_size=500):
+    """
+    Applies one batch of unprocessed events and returns how many were handled.
+    Transitions are grouped into one conditional UPDATE per target status, so a
+    burst of payments costs a handful of queries rather than a get/save each.
+    An event that cannot be read is marked processed with its error in
+    last_error, so it never blocks the events queued behind it.
+    """
+    with transaction.atomic():
+        pending = StripeEvent.objects.filter(processed_at__isnull=True).order_by('received_at')
+        if connection.features.has_select_for_update_skip_locked:
+            # Lets several processors drain the inbox without blocking each other.
+            pending = pending.select_for_update(skip_locked=True)
+        events = list(pending[:batch_size])
+        if not events:
+            return 0
+
+        paid, failed, expired = set(), set(), {}
+        errors = {}
+        for event in events:
+            try:
+                _classify(event, paid, failed, expired)
+            except Exception as e:
+                errors[event.pk] = f'{e.__class__.__name__}: {e}'
+
+        _apply_payments(paid, failed)
+        # A failed payment's hold would keep its freed slot unbookable until it lapsed.
+        if paid or failed:
+            release_holds(paid | failed)
+        # An abandoned checkout gives its slot back; a payment in the same batch wins.
+        expired = {pk: session_id for pk, session_id in expired.items() if pk not in paid}
+        if expired:
+            expire_checkouts(list(expired), expired_sessions=[sid for sid in expired.values() if sid])
+
+        now = timezone.now()
+        StripeEvent.objects.filter(pk__in=[event.pk for event in events if event.pk not in errors]).update(processed_at=now)
+        for pk, error in errors.items():
+            StripeEvent.objects.filter(pk=pk).update(processed_at=now, last_error=error)
+    return len(events)
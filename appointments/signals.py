@@ -1,16 +1,15 @@
 # appointments/signals.py
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
-from django.conf import settings
 from .models import Appointment
-from providers.models import ProviderService, ServiceProvider # Correct imports
+from .outbox import queue_email
 
 @receiver(post_save, sender=Appointment)
 def send_booking_confirmation_email(sender, instance, created, **kwargs):
     """
-    Sends an email and SMS confirmation when a new appointment is created.
+    Queues an email confirmation when a new appointment is created.
+    Delivery happens in the send_queued_emails worker, never in the request.
     """
     # Only send on initial creation of the appointment
     if created:
@@ -18,15 +17,8 @@ def send_booking_confirmation_email(sender, instance, created, **kwargs):
         message = f"Hello {instance.client.username},\n\nYour appointment has been successfully booked.\n"
         html_message = render_to_string('appointments/email_notification.html', {'appointment': instance})
         
-        # Send email confirmation
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [instance.client.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        # Queue email confirmation
+        queue_email(subject, message, instance.client.email, html_body=html_message)
         
         # Placeholder for SMS notification logic
         # You would use an SMS library like Twilio here.
@@ -1,3 +1,485 @@
-from django.test import TestCase
+# appointments/tests.py
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from array import array
+from datetime import date, time, timedelta
+from pathlib import Path
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import UserRole
+from booking_system import metrics
+from providers import cache, stripe_client
+from providers.availability import open_time_slots
+from providers.fake_stripe import FakeStripeServer
+from providers.models import ServiceProvider, ProviderService, ProviderTimeSlot, ServiceLocation
+from services.models import ServiceCategory, ServiceSubCategory, Service
+from .booking import SlotUnavailable, book_appointment, hold_slot, release_expired_holds
+from .models import Appointment, OutboundEmail, SlotHold, StripeEvent
+from .pagination import decode_cursor, encode_cursor, keyset_page
+from .outbox import process_outbox, send_batch
+from .payments import process_stripe_events, record_event
 
-# Create your tests here.
+
+def make_provider_service(username='provider', subcategory=None):
+    """A provider with one service offering in `subcategory` (created if omitted)."""
+    if subcategory is None:
+        category = ServiceCategory.objects.get_or_create(name='Beauty')[0]
+        subcategory = ServiceSubCategory.objects.get_or_create(name='Facials', category=category)[0]
+    user = User.objects.create_user(username)
+    UserRole.objects.create(user=user, role='service_provider')
+    provider = ServiceProvider.objects.create(user=user)
+    service = Service.objects.get_or_create(name='Facial', sub_category=subcategory)[0]
+    provider_service = ProviderService.objects.create(
+        provider=provider, service=service, sub_category=subcategory, name=f'{username} facial',
+        description='', duration_minutes=60, price=Decimal('50.00'), image='',
+    )
+    provider_service.locations.add(ServiceLocation.objects.get_or_create(name='Online')[0])
+    return provider_service
+
+
+def make_client(username='client'):
+    user = User.objects.create_user(username, email=f'{username}@example.com')
+    UserRole.objects.create(user=user, role='client')
+    return user
+
+
+def make_slot(provider, day=None, hour=9):
+    return ProviderTimeSlot.objects.create(
+        provider=provider, date=day or date.today() + timedelta(days=1),
+        start_time=time(hour), end_time=time(hour + 1),
+    )
+
+
+@skipUnless(connection.vendor == 'sqlite', "asserts on SQLite's EXPLAIN QUERY PLAN output")
+class AppointmentIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        client = make_client()
+        statuses = [status for status, _ in Appointment.STATUS_CHOICES]
+        start = date.today() - timedelta(days=30)
+        for n in range(5):
+            provider_service = make_provider_service(f'provider{n}')
+            provider = provider_service.provider
+            slots = ProviderTimeSlot.objects.bulk_create([
+                ProviderTimeSlot(provider=provider, date=start + timedelta(days=day), start_time=time(hour), end_time=time(hour + 1))
+                for day in range(60) for hour in range(9, 13)
+            ])
+            # bulk_create skips Appointment.save(), so the provider is set here.
+            Appointment.objects.bulk_create([
+                Appointment(client=client, provider_service=provider_service, provider=provider, time_slot=slot,
+                            date=slot.date, status=statuses[i % len(statuses)])
+                for i, slot in enumerate(slots)
+            ])
+        cls.provider = provider
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_provider_status_filter_uses_index(self):
+        queryset = Appointment.objects.filter(provider=self.provider, status='pending').order_by('date')
+        self.assertUsesIndex(queryset, 'appt_provider_status_date')
+
+    def test_provider_date_range_uses_index(self):
+        today = date.today()
+        queryset = Appointment.objects.filter(
+            provider=self.provider, date__range=(today, today + timedelta(days=7)),
+        ).exclude(status__in=['rejected', 'failed'])
+        self.assertUsesIndex(queryset, 'appt_provider_date_status')
+
+    def test_open_slots_for_a_day_use_index(self):
+        queryset = ProviderTimeSlot.objects.filter(
+            provider=self.provider, date=date.today(), is_booked=False,
+        ).order_by('start_time')
+        # Either slot_provider_date_booked or unique_provider_time_slot's
+        # index serves this; what matters is that it is not a table scan.
+        self.assertUsesIndex(queryset, 'USING INDEX')
+        self.assertIn('provider_id=? AND date=?', queryset.explain())
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    THREADS = 20
+
+    def test_only_one_of_many_concurrent_bookings_claims_the_slot(self):
+        provider_service = make_provider_service()
+        slot = make_slot(provider_service.provider)
+        clients = [make_client(f'client{n}') for n in range(self.THREADS)]
+        barrier = threading.Barrier(self.THREADS)
+        outcomes = []
+
+        def book(client):
+            try:
+                barrier.wait()
+                try:
+                    book_appointment(client, provider_service, slot)
+                    outcomes.append('booked')
+                except SlotUnavailable:
+                    outcomes.append('unavailable')
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=book, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count('booked'), 1)
+        self.assertEqual(outcomes.count('unavailable'), self.THREADS - 1)
+        self.assertEqual(Appointment.objects.filter(time_slot=slot).count(), 1)
+        slot.refresh_from_db()
+        self.assertTrue(slot.is_booked)
+
+
+def make_approved_appointment(username='client'):
+    provider_service = make_provider_service(f'{username}-provider')
+    slot = make_slot(provider_service.provider)
+    appointment = book_appointment(make_client(username), provider_service, slot)
+    Appointment.objects.filter(pk=appointment.pk).update(status='approved')
+    appointment.status = 'approved'
+    return appointment
+
+
+def checkout_event(event_type, appointment, session_id='cs_1', **session):
+    return {
+        'id': f'evt_{event_type}_{appointment.pk}_{session_id}',
+        'type': event_type,
+        'data': {'object': {'id': session_id, 'metadata': {'appointment_id': str(appointment.pk)}, **session}},
+    }
+
+
+class CheckoutExpiryTests(TestCase):
+    def assertReleased(self, appointment):
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'failed')
+        self.assertFalse(ProviderTimeSlot.objects.get(pk=appointment.time_slot_id).is_booked)
+        self.assertFalse(SlotHold.objects.filter(appointment=appointment).exists())
+
+    def test_expired_session_releases_the_slot(self):
+        appointment = make_approved_appointment()
+        SlotHold.objects.filter(pk=hold_slot(appointment).pk).update(session_id='cs_1')
+        record_event(checkout_event('checkout.session.expired', appointment))
+        process_stripe_events()
+        self.assertReleased(appointment)
+
+    def test_expiry_of_a_replaced_session_keeps_the_checkout(self):
+        appointment = make_approved_appointment()
+        SlotHold.objects.filter(pk=hold_slot(appointment).pk).update(session_id='cs_2')
+        record_event(checkout_event('checkout.session.expired', appointment, session_id='cs_1'))
+        process_stripe_events()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'approved')
+        self.assertTrue(SlotHold.objects.filter(appointment=appointment).exists())
+
+    def test_sweep_releases_lapsed_holds_after_the_grace_period(self):
+        lapsed, recent = make_approved_appointment('lapsed'), make_approved_appointment('recent')
+        now = timezone.now()
+        SlotHold.objects.filter(pk=hold_slot(lapsed).pk).update(expires_at=now - timedelta(hours=1))
+        SlotHold.objects.filter(pk=hold_slot(recent).pk).update(expires_at=now - timedelta(seconds=10))
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertReleased(lapsed)
+        recent.refresh_from_db()
+        self.assertEqual(recent.status, 'approved')
+
+    def test_sweep_leaves_paid_appointments_alone(self):
+        appointment = make_approved_appointment()
+        SlotHold.objects.filter(pk=hold_slot(appointment).pk).update(expires_at=timezone.now() - timedelta(hours=1))
+        Appointment.objects.filter(pk=appointment.pk).update(status='paid')
+        release_expired_holds()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'paid')
+        self.assertTrue(ProviderTimeSlot.objects.get(pk=appointment.time_slot_id).is_booked)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Query counts of the list views. They must not depend on how many rows a
+    page lists; a view that goes over has almost certainly grown an N+1.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = make_client()
+        services = [make_provider_service(f'provider{n}') for n in range(4)]
+        cls.provider_user = services[0].provider.user
+        cls.subcategory_id = services[0].sub_category_id
+        for hour in range(9, 15):
+            for provider_service in services[:2]:
+                appointment = book_appointment(cls.client_user, provider_service, make_slot(provider_service.provider, hour=hour))
+                if hour % 2:
+                    Appointment.objects.filter(pk=appointment.pk).update(status='approved')
+
+    def assertQueryBudget(self, user, url, budget):
+        self.client.force_login(user)
+        # One untimed load first, so one-off work such as rebuilding the
+        # catalog snapshot is not charged to the page.
+        self.client.get(url)
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_client_appointments(self):
+        self.assertQueryBudget(self.client_user, reverse('client_appointments'), 4)
+
+    def test_provider_dashboard(self):
+        self.assertQueryBudget(self.provider_user, reverse('provider_dashboard'), 8)
+
+    def test_manage_appointments(self):
+        self.assertQueryBudget(self.provider_user, reverse('manage_appointments'), 7)
+
+    def test_select_provider_service(self):
+        self.assertQueryBudget(self.client_user, reverse('select_provider_service', args=[self.subcategory_id]), 8)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1', EMAIL_PORT=1,
+    EMAIL_TIMEOUT=2, EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+)
+class OutboxConnectionFailureTests(TestCase):
+    def test_unreachable_server_counts_as_a_failed_attempt(self):
+        email = OutboundEmail.objects.create(to='client@example.com', subject='Hi', body='Hello')
+        self.assertEqual(send_batch(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.claim_token), ('pending', 1, ''))
+        self.assertTrue(email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+    def test_last_attempt_marks_the_email_failed(self):
+        email = OutboundEmail.objects.create(to='client@example.com', subject='Hi', body='Hello', attempts=2)
+        send_batch()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 3))
+
+    def test_a_crashing_batch_does_not_stop_the_worker(self):
+        with mock.patch('appointments.outbox.send_batch', side_effect=RuntimeError('boom')):
+            with self.assertLogs('appointments.outbox', 'ERROR'):
+                self.assertEqual(process_outbox(workers=2), (0, 0))
+
+
+class StripeEventProcessingTests(TestCase):
+    def test_malformed_event_is_marked_failed_and_does_not_block_the_inbox(self):
+        appointment = make_approved_appointment()
+        record_event({'id': 'evt_bad', 'type': 'checkout.session.completed', 'data': None})
+        record_event({'id': 'evt_no_metadata', 'type': 'checkout.session.completed',
+                      'data': {'object': {'id': 'cs_0', 'metadata': None, 'payment_status': 'paid'}}})
+        record_event(checkout_event('checkout.session.completed', appointment, payment_status='paid'))
+
+        self.assertEqual(process_stripe_events(), 3)
+
+        bad = StripeEvent.objects.get(event_id='evt_bad')
+        self.assertIsNotNone(bad.processed_at)
+        self.assertIn('TypeError', bad.last_error)
+        self.assertEqual(StripeEvent.objects.get(event_id='evt_no_metadata').last_error, '')
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'paid')
+        self.assertFalse(StripeEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_failed_payment_releases_the_slot(self):
+        appointment = make_approved_appointment()
+        versions = cache.get_versions(appointment.provider_id, appointment.date)
+        record_event(checkout_event('checkout.session.async_payment_failed', appointment))
+        with self.captureOnCommitCallbacks(execute=True):
+            process_stripe_events()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'failed')
+        self.assertFalse(ProviderTimeSlot.objects.get(pk=appointment.time_slot_id).is_booked)
+        self.assertNotEqual(cache.get_versions(appointment.provider_id, appointment.date), versions)
+
+    def test_failed_payment_drops_the_hold(self):
+        appointment = make_approved_appointment()
+        hold_slot(appointment)
+        record_event(checkout_event('checkout.session.async_payment_failed', appointment))
+        process_stripe_events()
+        slot = ProviderTimeSlot.objects.get(pk=appointment.time_slot_id)
+        self.assertFalse(SlotHold.objects.filter(appointment=appointment).exists())
+        self.assertTrue(open_time_slots().filter(pk=slot.pk).exists())
+        book_appointment(make_client('other'), appointment.provider_service, slot)
+
+    def test_success_after_failure_wins_the_slot_back(self):
+        appointment = make_approved_appointment()
+        record_event(checkout_event('checkout.session.async_payment_failed', appointment))
+        process_stripe_events()
+        record_event(checkout_event('checkout.session.async_payment_succeeded', appointment))
+        process_stripe_events()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'paid')
+        self.assertTrue(ProviderTimeSlot.objects.get(pk=appointment.time_slot_id).is_booked)
+
+    def test_success_after_failure_does_not_take_a_rebooked_slot(self):
+        appointment = make_approved_appointment()
+        record_event(checkout_event('checkout.session.async_payment_failed', appointment))
+        process_stripe_events()
+        slot = ProviderTimeSlot.objects.get(pk=appointment.time_slot_id)
+        book_appointment(make_client('other'), appointment.provider_service, slot)
+        record_event(checkout_event('checkout.session.async_payment_succeeded', appointment))
+        process_stripe_events()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'failed')
+
+
+class CheckoutSessionAccessTests(TestCase):
+    def setUp(self):
+        self.appointment = make_approved_appointment()
+        self.url = reverse('create_checkout_session', args=[self.appointment.pk])
+
+    def test_anonymous_users_are_sent_to_log_in(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_other_clients_get_403(self):
+        self.client.force_login(make_client('other'))
+        self.assertEqual(self.client.post(self.url).status_code, 403)
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_appointments_not_awaiting_payment_get_403(self):
+        Appointment.objects.filter(pk=self.appointment.pk).update(status='pending')
+        self.client.force_login(self.appointment.client)
+        self.assertEqual(self.client.post(self.url).status_code, 403)
+        self.assertFalse(SlotHold.objects.exists())
+
+
+class CheckoutSessionReuseTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stripe = FakeStripeServer()
+        cls.stripe.start()
+        cls.addClassCleanup(cls.stripe.stop)
+
+    def setUp(self):
+        self.stripe.sessions.clear()
+        self.stripe.request_log.clear()
+        overridden = override_settings(STRIPE_API_BASE=self.stripe.url, STRIPE_MAX_NETWORK_RETRIES=0)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        # The client is built once per process from these settings.
+        stripe_client._client = None
+        self.addCleanup(setattr, stripe_client, '_client', None)
+
+    def test_repeated_checkout_reuses_the_open_session(self):
+        appointment = make_approved_appointment()
+        self.client.force_login(appointment.client)
+        url = reverse('create_checkout_session', args=[appointment.pk])
+
+        first = self.client.post(url).json()
+        second = self.client.post(url).json()
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.stripe.request_log, [('POST', '/v1/checkout/sessions')])
+        session = self.stripe.sessions[first['sessionId']]
+        self.assertEqual(session['metadata'], {'appointment_id': str(appointment.pk)})
+        self.assertEqual(SlotHold.objects.get(appointment=appointment).session_id, session['id'])
+
+    def test_another_clients_appointment_is_refused(self):
+        appointment = make_approved_appointment()
+        self.client.force_login(make_client('other'))
+        response = self.client.post(reverse('create_checkout_session', args=[appointment.pk]))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.stripe.request_log, [])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        provider_service = make_provider_service()
+        cls.user = make_client()
+        cls.appointments = []
+        for day in range(3):
+            for hour in (10, 9):
+                slot = make_slot(provider_service.provider, date.today() + timedelta(days=day + 1), hour)
+                cls.appointments.append(Appointment.objects.create(
+                    client=cls.user, provider_service=provider_service, time_slot=slot, date=slot.date,
+                ))
+        # Another client's appointment on the same days must never leak in.
+        other_slot = make_slot(provider_service.provider, date.today() + timedelta(days=2), 15)
+        cls.other = Appointment.objects.create(
+            client=make_client('other'), provider_service=provider_service, time_slot=other_slot, date=other_slot.date,
+        )
+
+    def test_cursor_round_trip(self):
+        appointment = self.appointments[0]
+        cursor = encode_cursor(appointment)
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor), (appointment.date, appointment.pk))
+
+    def test_malformed_cursors_raise_value_error(self):
+        for cursor in ('', '!!!', 'bm90LWEtY3Vyc29y', '2030-01-01:1', '_-8', encode_cursor(self.appointments[0])[:-2]):
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_pages_follow_date_then_id(self):
+        queryset = Appointment.objects.filter(client=self.user)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(queryset, cursor, page_size=4)
+            seen += [row.pk for row in rows]
+            if cursor is None:
+                break
+        expected = sorted(self.appointments, key=lambda appointment: (appointment.date, appointment.pk))
+        self.assertEqual(seen, [appointment.pk for appointment in expected])
+
+    def test_views_reject_invalid_cursors(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('client_appointments_api'), {'cursor': 'not a cursor'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('client_appointments'), {'cursor': 'not a cursor'})
+        self.assertRedirects(response, reverse('client_appointments'), fetch_redirect_response=False)
+
+    def test_tampered_cursor_stays_within_the_clients_appointments(self):
+        self.client.force_login(self.user)
+        # A well-formed cursor forged from another client's appointment only
+        # moves the seek position.
+        response = self.client.get(reverse('client_appointments_api'), {'cursor': encode_cursor(self.other)})
+        ids = [row['id'] for row in response.json()['results']]
+        self.assertNotIn(self.other.pk, ids)
+        self.assertTrue(set(ids) <= {appointment.pk for appointment in self.appointments})
+
+
+class MetricsFilesTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        overridden = override_settings(METRICS_DIR=self.directory)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def write_worker_file(self, pid, pending):
+        values = array('d', bytes(metrics._SIZE * 8))
+        values[metrics._TRANSITION_INDEX[('new', 'pending')]] = pending
+        path = self.directory / f'{metrics._PREFIX}{pid}.bin'
+        path.write_bytes(values.tobytes())
+        return path
+
+    def test_exited_workers_are_folded_into_the_aggregate(self):
+        exited = [subprocess.Popen([sys.executable, '-c', '']) for _ in range(2)]
+        for process in exited:
+            process.wait()
+        dead = [self.write_worker_file(process.pid, 2) for process in exited]
+        live = self.write_worker_file(os.getppid(), 5)
+        index = metrics._TRANSITION_INDEX[('new', 'pending')]
+
+        self.assertEqual(metrics.collect()[index], 9)
+        self.assertFalse(any(path.exists() for path in dead))
+        self.assertTrue(live.exists())
+        self.assertTrue((self.directory / metrics._AGGREGATE).exists())
+        # Folding again must not count the exited workers twice.
+        self.assertEqual(metrics.collect()[index], 9)
+
+    def test_addresses_are_not_trusted_by_default(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 403)
+        with override_settings(METRICS_ALLOWED_IPS=('127.0.0.1',)):
+            response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
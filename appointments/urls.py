@@ -7,6 +7,8 @@ urlpatterns = [
     path('my-appointments/', views.client_appointments, name='appointment_list'), # Corrected URL name
     path('category/<int:category_id>/', views.select_subcategory, name='select_subcategory'),
     path('subcategory/<int:subcategory_id>/', views.select_provider_service, name='select_provider_service'),
+    path('search/', views.search_services, name='search_services'),
     path('request-appointment/<int:provider_service_id>/', views.appointment_request, name='appointment_request'),
     path('my-appointments/', views.client_appointments, name='client_appointments'),
+    path('api/my-appointments/', views.client_appointments_api, name='client_appointments_api'),
 ]
\ No newline at end of file
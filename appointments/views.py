@@ -3,28 +3,94 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Appointment
-from providers.models import ProviderService, ProviderTimeSlot, ServiceLocation
-from services.models import ServiceCategory, ServiceSubCategory
+from providers.models import ProviderService
 from .forms import AppointmentRequestForm
+from .booking import book_appointment, SlotUnavailable
 from django.conf import settings # NEW: Import settings
+from django.http import JsonResponse, Http404
+from .pagination import paginate, serialize_appointment
+from services.catalog import get_catalog
+from providers.search import search_services as run_search
+from providers import facets
+
+SERVICES_PAGE_SIZE = 24
 
 @login_required
 def home_page(request):
-    categories = ServiceCategory.objects.all()
+    categories = get_catalog().categories
     return render(request, 'appointments/home.html', {'categories': categories})
 
 @login_required
 def select_subcategory(request, category_id):
-    category = get_object_or_404(ServiceCategory, id=category_id)
-    subcategories = category.subcategories.all()
+    catalog = get_catalog()
+    category = catalog.category_by_id.get(category_id)
+    if category is None:
+        raise Http404('No ServiceCategory matches the given query.')
+    subcategories = catalog.subcategories_of(category_id)
     return render(request, 'appointments/select_subcategory.html', {'category': category, 'subcategories': subcategories})
 
 @login_required
 def select_provider_service(request, subcategory_id):
-    subcategory = get_object_or_404(ServiceSubCategory, id=subcategory_id)
-    provider_services = ProviderService.objects.filter(sub_category=subcategory)
-    locations = ServiceLocation.objects.all()
-    return render(request, 'appointments/select_provider_service.html', {'subcategory': subcategory, 'provider_services': provider_services, 'locations': locations})
+    catalog = get_catalog()
+    subcategory = catalog.subcategory_by_id.get(subcategory_id)
+    if subcategory is None:
+        raise Http404('No ServiceSubCategory matches the given query.')
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    services = ProviderService.objects.filter(sub_category=subcategory)
+    filters = facets.parse_filters(request.GET)
+    counts = facets.facet_counts(services, filters)
+    offset = (page - 1) * SERVICES_PAGE_SIZE
+    provider_services = list(
+        facets.apply_filters(services.for_listing(), filters).order_by('pk')[offset:offset + SERVICES_PAGE_SIZE + 1]
+    )
+    has_next = len(provider_services) > SERVICES_PAGE_SIZE
+
+    location_facets = [
+        (location, counts['locations'].get(location.pk, 0), location.pk in filters['locations'])
+        for location in catalog.locations
+        if location.pk in counts['locations'] or location.pk in filters['locations']
+    ]
+    price_facets = [
+        (i, facets.bucket_label(bucket, lambda value: f'${value}'), counts['price'][i], filters['price'] == i)
+        for i, bucket in enumerate(facets.PRICE_BUCKETS)
+    ]
+    duration_facets = [
+        (i, facets.bucket_label(bucket, lambda value: f'{value} min'), counts['duration'][i], filters['duration'] == i)
+        for i, bucket in enumerate(facets.DURATION_BUCKETS)
+    ]
+    query = request.GET.copy()
+    query.pop('page', None)
+    context = {
+        'subcategory': subcategory,
+        'provider_services': provider_services[:SERVICES_PAGE_SIZE],
+        'location_facets': location_facets,
+        'price_facets': price_facets,
+        'duration_facets': duration_facets,
+        'page': page,
+        'has_next': has_next,
+        'filter_query': query.urlencode(),
+    }
+    return render(request, 'appointments/select_provider_service.html', context)
+
+@login_required
+def search_services(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    provider_services, has_next = run_search(query, page=page) if query else ([], False)
+    context = {
+        'query': query,
+        'provider_services': provider_services,
+        'page': page,
+        'has_next': has_next,
+    }
+    return render(request, 'appointments/search_results.html', context)
 
 @login_required
 def appointment_request(request, provider_service_id):
@@ -32,9 +98,16 @@ def appointment_request(request, provider_service_id):
     if request.method == 'POST':
         form = AppointmentRequestForm(request.POST)
         if form.is_valid():
-            appointment = form.save(commit=False)
-            appointment.client = request.user
-            appointment.save()
+            try:
+                book_appointment(
+                    request.user,
+                    provider_service,
+                    form.cleaned_data['time_slot'],
+                    form.cleaned_data['location'],
+                )
+            except SlotUnavailable:
+                messages.error(request, 'Sorry, that time slot was just booked. Please choose another one.')
+                return redirect('appointment_request', provider_service_id=provider_service.id)
             messages.success(request, 'Appointment request sent successfully!')
             return redirect('client_appointments')
     else:
@@ -44,10 +117,29 @@ def appointment_request(request, provider_service_id):
 
 @login_required
 def client_appointments(request):
-    appointments = Appointment.objects.filter(client=request.user)
+    appointments = Appointment.objects.with_details().filter(client=request.user)
+    try:
+        appointments, next_cursor = paginate(appointments, request.GET)
+    except ValueError:
+        return redirect('client_appointments')
     
     context = {
         'appointments': appointments,
+        'next_cursor': next_cursor,
+        'status': request.GET.get('status', ''),
         'settings': settings, # NEW: Pass settings to the template
     }
     return render(request, 'appointments/client_appointments.html', context)
+
+@login_required
+def client_appointments_api(request):
+    # JSON variant of client_appointments for lazy-loading further pages.
+    appointments = Appointment.objects.with_details().filter(client=request.user)
+    try:
+        appointments, next_cursor = paginate(appointments, request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'results': [serialize_appointment(appt) for appt in appointments],
+        'next_cursor': next_cursor,
+    })
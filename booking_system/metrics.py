@@ -0,0 +1,265 @@
+# booking_system/metrics.py
+import fcntl
+import mmap
+import os
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.http import HttpResponse
+
+# The booking funnel, in the order a client walks through it.
+FUNNEL_VIEWS = (
+    'home_page',
+    'select_subcategory',
+    'select_provider_service',
+    'appointment_request',
+    'create_checkout_session',
+    'stripe_webhook',
+)
+RESPONSE_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+# Appointment statuses; 'new' is the source of a freshly booked appointment.
+STATUSES = ('pending', 'approved', 'rejected', 'paid', 'failed', 'completed')
+SOURCE_STATUSES = ('new',) + STATUSES
+
+# Every value lives at a fixed offset in a flat array of doubles, so recording
+# is a few indexed additions with no label lookups or dict building.
+# Per view: one counter per response class, one per latency bucket (+Inf
+# last, not cumulative), then the latency sum.
+_VIEW_WIDTH = len(RESPONSE_CLASSES) + len(LATENCY_BUCKETS) + 2
+_BUCKETS_OFFSET = len(RESPONSE_CLASSES)
+_SUM_OFFSET = _VIEW_WIDTH - 1
+_VIEW_INDEX = {name: i * _VIEW_WIDTH for i, name in enumerate(FUNNEL_VIEWS)}
+_TRANSITIONS_BASE = len(FUNNEL_VIEWS) * _VIEW_WIDTH
+_TRANSITION_INDEX = {
+    (source, target): _TRANSITIONS_BASE + i * len(STATUSES) + j
+    for i, source in enumerate(SOURCE_STATUSES) for j, target in enumerate(STATUSES)
+}
+_SIZE = _TRANSITIONS_BASE + len(SOURCE_STATUSES) * len(STATUSES)
+
+# Files written with a different layout (an older deploy) are ignored.
+_LAYOUT = zlib.crc32(repr((FUNNEL_VIEWS, RESPONSE_CLASSES, LATENCY_BUCKETS, SOURCE_STATUSES, STATUSES)).encode())
+_PREFIX = f'metrics_{_LAYOUT:08x}_'
+# Files of exited workers are folded into this one, so the directory holds
+# one file per live worker plus the aggregate however often workers recycle.
+_AGGREGATE = f'{_PREFIX}aggregate.bin'
+
+# Each process writes only its own file, so the lock only orders threads
+# within one process and is never contended across workers.
+_lock = threading.Lock()
+_pid = None
+_map = None
+_values = None
+
+
+def _directory():
+    return Path(settings.METRICS_DIR)
+
+
+def _open():
+    # Called again after a fork, so a pre-forking server's workers never
+    # share the parent's file.
+    global _pid, _map, _values
+    directory = _directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    size = _SIZE * 8
+    with open(directory / f'{_PREFIX}{os.getpid()}.bin', 'a+b') as f:
+        if os.fstat(f.fileno()).st_size < size:
+            f.truncate(size)
+        _map = mmap.mmap(f.fileno(), size)
+    _values = memoryview(_map).cast('d')
+    _pid = os.getpid()
+
+
+def _current_values():
+    if _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid():
+                _open()
+    return _values
+
+
+def record_request(view, status_code, seconds):
+    """Counts one request to a funnel view and adds its latency to the histogram."""
+    base = _VIEW_INDEX.get(view)
+    if base is None or not settings.METRICS_ENABLED:
+        return
+    values = _current_values()
+    response_class = min(max(status_code // 100, 1), 5) - 1
+    bucket = bisect_left(LATENCY_BUCKETS, seconds)
+    with _lock:
+        values[base + response_class] += 1
+        values[base + _BUCKETS_OFFSET + bucket] += 1
+        values[base + _SUM_OFFSET] += seconds
+
+
+def record_transition(source, target, count=1):
+    """Counts appointments moved from `source` (None for new ones) to `target`."""
+    index = _TRANSITION_INDEX.get((source or 'new', target))
+    if index is None or not count or not settings.METRICS_ENABLED:
+        return
+    values = _current_values()
+    with _lock:
+        values[index] += count
+
+
+def record_transitions(transitions):
+    """Records a mapping of (source, target) pairs to counts."""
+    for (source, target), count in transitions.items():
+        record_transition(source, target, count)
+
+
+def _read(path):
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    return array('d', data) if len(data) == _SIZE * 8 else None
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _fold_exited():
+    """Adds the files of exited workers to the aggregate file and deletes them."""
+    directory = _directory()
+    exited = []
+    for path in directory.glob(f'{_PREFIX}*.bin'):
+        pid = path.stem[len(_PREFIX):]
+        if pid.isdigit() and int(pid) != os.getpid() and not _is_running(int(pid)):
+            exited.append(path)
+    if not exited:
+        return
+    # Scrapes in other workers may fold at the same time.
+    with open(directory / f'{_PREFIX}lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        aggregate = directory / _AGGREGATE
+        totals = _read(aggregate) or array('d', bytes(_SIZE * 8))
+        folded = []
+        for path in exited:
+            values = _read(path)
+            if values is None:
+                continue
+            for i, value in enumerate(values):
+                totals[i] += value
+            folded.append(path)
+        if not folded:
+            return
+        # Replaced in one step, so a concurrent collect() reads the old or
+        # the new aggregate and never a half-written one.
+        temporary = directory / f'{_PREFIX}aggregate.tmp'
+        temporary.write_bytes(totals.tobytes())
+        os.replace(temporary, aggregate)
+        for path in folded:
+            path.unlink(missing_ok=True)
+
+
+def collect():
+    """Sums the aggregate of exited workers and the file of every live one."""
+    directory = _directory()
+    if directory.is_dir():
+        _fold_exited()
+    totals = array('d', bytes(_SIZE * 8))
+    for path in directory.glob(f'{_PREFIX}*.bin'):
+        values = _read(path)
+        if values is None:
+            continue
+        for i, value in enumerate(values):
+            totals[i] += value
+    return totals
+
+
+def _number(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(totals):
+    """Formats collected totals in the Prometheus text exposition format."""
+    lines = [
+        '# HELP booking_funnel_requests_total Requests to booking funnel views by response class.',
+        '# TYPE booking_funnel_requests_total counter',
+    ]
+    for view, base in _VIEW_INDEX.items():
+        for i, response_class in enumerate(RESPONSE_CLASSES):
+            lines.append(f'booking_funnel_requests_total{{view="{view}",code="{response_class}"}} {_number(totals[base + i])}')
+
+    lines += [
+        '# HELP booking_funnel_request_duration_seconds Latency of booking funnel views.',
+        '# TYPE booking_funnel_request_duration_seconds histogram',
+    ]
+    for view, base in _VIEW_INDEX.items():
+        cumulative = 0.0
+        for i, bound in enumerate(LATENCY_BUCKETS + (None,)):
+            cumulative += totals[base + _BUCKETS_OFFSET + i]
+            le = '+Inf' if bound is None else repr(bound)
+            lines.append(f'booking_funnel_request_duration_seconds_bucket{{view="{view}",le="{le}"}} {_number(cumulative)}')
+        lines.append(f'booking_funnel_request_duration_seconds_sum{{view="{view}"}} {_number(totals[base + _SUM_OFFSET])}')
+        lines.append(f'booking_funnel_request_duration_seconds_count{{view="{view}"}} {_number(cumulative)}')
+
+    lines += [
+        '# HELP booking_appointment_transitions_total Appointment status changes.',
+        '# TYPE booking_appointment_transitions_total counter',
+    ]
+    for (source, target), index in _TRANSITION_INDEX.items():
+        if totals[index]:
+            lines.append(f'booking_appointment_transitions_total{{from="{source}",to="{target}"}} {_number(totals[index])}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    Times requests to the funnel views in FUNNEL_VIEWS. It belongs near the
+    top of MIDDLEWARE so the latency covers sessions, auth and CSRF too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    def _record(self, request, response, started):
+        match = request.resolver_match
+        if match is not None:
+            # Decorators keep the view's __name__, so this is the function name.
+            record_request(getattr(match.func, '__name__', None), response.status_code, time.perf_counter() - started)
+
+
+def metrics(request):
+    # Scrapers usually have no session, so their addresses can be allowed
+    # explicitly; REMOTE_ADDR is the proxy's address behind a reverse proxy.
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS and not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
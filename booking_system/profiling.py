@@ -0,0 +1,213 @@
+# booking_system/profiling.py
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+from django.template.backends.django import Template as DjangoTemplate
+from django.utils import timezone
+
+# The profile of the request being handled on this thread or task, if sampled.
+_current = ContextVar('request_profile', default=None)
+
+# The slowest recent sampled requests, newest last; exposed to staff by profiling_samples.
+samples = deque(maxlen=settings.PROFILING_BUFFER_SIZE)
+
+_patch_lock = threading.Lock()
+_patched = False
+
+
+class RequestProfile:
+    __slots__ = ('started', 'view_started', 'sql_count', 'sql_ms', 'render_ms', 'render_depth', 'external_count', 'external_ms')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.render_ms = 0.0
+        self.render_depth = 0
+        self.external_count = 0
+        self.external_ms = 0.0
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.sql_count += 1
+        profile.sql_ms += (time.perf_counter() - started) * 1000
+
+
+@contextmanager
+def external_call():
+    """Times a call to an outside service (Stripe, mail, ...) against the current request."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.external_count += 1
+        profile.external_ms += (time.perf_counter() - started) * 1000
+
+
+def _add_sql_wrapper(connection, **kwargs):
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+def _install_sql_timer():
+    # Every connection keeps the wrapper for its lifetime; unsampled requests
+    # pay one context variable lookup per query. Async views run their queries
+    # on worker threads with their own connections, which is why this is not
+    # scoped to the connections of the request's thread.
+    connection_created.connect(_add_sql_wrapper, dispatch_uid='profiling_sql_timer')
+    for connection in connections.all(initialized_only=True):
+        _add_sql_wrapper(connection)
+
+
+def _install_render_timer():
+    # Wraps the Django template backend once per process. Nested renders
+    # (emails rendered inside a view) are only counted at the outermost level.
+    global _patched
+    with _patch_lock:
+        if _patched:
+            return
+        original_render = DjangoTemplate.render
+
+        def render(self, *args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return original_render(self, *args, **kwargs)
+            profile.render_depth += 1
+            started = time.perf_counter()
+            try:
+                return original_render(self, *args, **kwargs)
+            finally:
+                profile.render_depth -= 1
+                if not profile.render_depth:
+                    profile.render_ms += (time.perf_counter() - started) * 1000
+
+        DjangoTemplate.render = render
+        _patched = True
+
+
+class ProfilingMiddleware:
+    """
+    Samples PROFILING_SAMPLE_RATE of requests and records their SQL, template
+    render, view and external-call time in a Server-Timing header. Sampled
+    requests slower than PROFILING_SLOW_MS are kept in `samples`. It belongs
+    at the top of MIDDLEWARE so `total` covers the whole stack. When profiling
+    is off the middleware removes itself at startup, so it costs nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED or settings.PROFILING_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # Under ASGI a sync hook would cost a thread hop per request.
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+        _install_sql_timer()
+        _install_render_timer()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._report(request, response, profile)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._report(request, response, profile)
+
+    def _report(self, request, response, profile):
+        finished = time.perf_counter()
+        total_ms = (finished - profile.started) * 1000
+        # From view dispatch to the response leaving the inner middleware;
+        # zero when a middleware answered before the view ran.
+        view_ms = (finished - profile.view_started) * 1000 if profile.view_started else 0.0
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total_ms:.1f}',
+            f'view;dur={view_ms:.1f}',
+            f'sql;dur={profile.sql_ms:.1f};desc="{profile.sql_count} queries"',
+            f'render;dur={profile.render_ms:.1f}',
+            f'external;dur={profile.external_ms:.1f};desc="{profile.external_count} calls"',
+        ])
+        if total_ms >= settings.PROFILING_SLOW_MS:
+            samples.append({
+                'recorded_at': timezone.now().isoformat(),
+                'method': request.method,
+                'path': request.path,
+                'view': getattr(request.resolver_match, 'view_name', None),
+                'status': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'view_ms': round(view_ms, 1),
+                'sql_ms': round(profile.sql_ms, 1),
+                'sql_count': profile.sql_count,
+                'render_ms': round(profile.render_ms, 1),
+                'external_ms': round(profile.external_ms, 1),
+                'external_count': profile.external_count,
+            })
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _mark_view_started()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        _mark_view_started()
+
+
+def _mark_view_started():
+    profile = _current.get()
+    if profile is not None:
+        profile.view_started = time.perf_counter()
+
+
+@login_required
+@user_passes_test(lambda user: user.is_staff, login_url='/accounts/login/')
+def profiling_samples(request):
+    # Slowest first, so the worst offenders are at the top of the list.
+    ordered = sorted(samples, key=lambda sample: sample['total_ms'], reverse=True)
+    return JsonResponse({
+        'enabled': settings.PROFILING_ENABLED,
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+        'slow_ms': settings.PROFILING_SLOW_MS,
+        'samples': ordered,
+    })
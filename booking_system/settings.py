@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,6 +50,8 @@ LOGOUT_REDIRECT_URL = 'logout_message' # Redirect after logout
 LOGIN_URL = 'login'  # URL for the login page
 
 MIDDLEWARE = [
+    'booking_system.profiling.ProfilingMiddleware',  # inactive unless PROFILING_ENABLED
+    'booking_system.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +61,24 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Opt-in request profiling: Server-Timing headers plus a buffer of slow
+# requests at /profiling/samples/ (staff only)
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0.05'))  # share of requests profiled
+PROFILING_SLOW_MS = 500  # sampled requests at least this slow are kept
+PROFILING_BUFFER_SIZE = 100
+
+# Booking funnel latency and appointment transition metrics, served in the
+# Prometheus text format at /metrics/. Every worker process writes its own
+# memory-mapped file in METRICS_DIR, which must be local to one host, and the
+# view sums them; clear the directory on deploy to reset the counters. Off
+# unless METRICS_ENABLED=1, so tests and management commands write no files.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED') == '1'
+METRICS_DIR = os.environ.get('METRICS_DIR', BASE_DIR / 'metrics')
+# Scraper addresses allowed without a staff login, comma-separated. Empty by
+# default: behind a reverse proxy every request comes from the proxy's address.
+METRICS_ALLOWED_IPS = tuple(ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip)
+
 ROOT_URLCONF = 'booking_system.urls'
 
 TEMPLATES = [
@@ -81,13 +103,83 @@ WSGI_APPLICATION = 'booking_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# DB_PROFILE selects the database: 'sqlite' (default) or 'postgres'.
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'booksmart'),
+            'USER': os.environ.get('DB_USER', 'booksmart'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+        }
+    }
+    if os.environ.get('DB_POOL', '1') == '1':
+        # psycopg 3 connection pool (pip install "psycopg[pool]"); it replaces
+        # persistent connections and also works under ASGI.
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+                'timeout': 10,  # seconds to wait for a free connection
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Take the write lock at BEGIN, so a transaction that reads before
+                # writing waits for busy_timeout instead of failing with
+                # "database is locked" when it tries to upgrade its lock.
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # Tests run on a file rather than the shared-cache in-memory default,
+            # whose table locks fail concurrent writers at once instead of
+            # waiting on busy_timeout.
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown DB_PROFILE {DB_PROFILE!r}; use 'sqlite' or 'postgres'.")
+
+# Applied to every new SQLite connection by booking_system.db
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',    # readers and the writer no longer block each other
+    'synchronous': 'NORMAL',  # with WAL, fsync only at checkpoints; still safe against corruption
+    'busy_timeout': 5000,     # ms to wait for the write lock before "database is locked"
+    'mmap_size': 268435456,   # read up to 256 MB of the file through the page cache
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory by default; point 'default' (or AVAILABILITY_CACHE_ALIAS) at a
+# shared backend such as Redis or Memcached when running several workers.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'booking-system',
     }
 }
 
+AVAILABILITY_CACHE_ALIAS = 'default'
+AVAILABILITY_CACHE_TIMEOUT = 60  # seconds; also bounds how long an expired slot hold can look active
+
+# How often each process re-reads the catalog version from the database; also
+# bounds how long a catalog edit made by another worker can go unseen.
+CATALOG_VERSION_CHECK_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -135,6 +227,11 @@ import os
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resized WebP/JPEG derivatives written next to uploaded images
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_WORKERS = 2  # processes in the resize pool
+
 LOGIN_REDIRECT_URL = 'login_redirect' # Redirects to our new view
 LOGOUT_REDIRECT_URL = 'logout_message'
 LOGIN_URL = 'login'
@@ -151,6 +248,20 @@ STRIPE_PUBLISHABLE_KEY = 'STRIPE_PUBLISHABLE_KEY'
 STRIPE_SECRET_KEY = 'STRIPE_SECRET_KEY'
 STRIPE_WEBHOOK_SECRET = 'STRIPE_WEBHOOK_SECRET'
 
+# Stripe API client tuning. STRIPE_API_BASE may point at a local fake server
+# (python manage.py run_fake_stripe) for development without real keys.
+STRIPE_API_BASE = None
+STRIPE_TIMEOUT_SECONDS = (3.05, 10)  # (connect, read)
+STRIPE_MAX_NETWORK_RETRIES = 2
+STRIPE_MAX_CONNECTIONS = 50  # concurrent Stripe requests per event loop (async views)
+
+# How long a time slot stays reserved while its appointment is in Stripe checkout.
+# Stripe requires checkout sessions to stay open for at least 30 minutes.
+SLOT_HOLD_TTL_SECONDS = 30 * 60
+# An expired hold is only released (appointment failed, slot freed) this much
+# later, so a payment completed just before expiry reaches the inbox first.
+SLOT_HOLD_GRACE_SECONDS = 5 * 60
+
 
 DOMAIN_NAME = 'DOMAIN_NAME'
 # ngrok URL to ALLOWED_HOSTS
@@ -178,6 +289,12 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # EMAIL_HOST_PASSWORD = 'your_sendgrid_password'
 DEFAULT_FROM_EMAIL = 'DEFAULT_FROM_EMAIL'
 
+# Booking notifications are queued in OutboundEmail and delivered by
+# `python manage.py send_queued_emails`; failed sends are retried with
+# exponential backoff starting at EMAIL_OUTBOX_RETRY_BASE_SECONDS.
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 60
+
 
 # Placeholder for SMS API configuration (e.g., Twilio)
 # TWILIO_ACCOUNT_SID = 'ACxxxxxxxxxxxxxxxxxxxx'
@@ -8,6 +8,8 @@ from accounts import views as accounts_views
 from providers import views as providers_views
 from django.conf import settings
 from django.conf.urls.static import static
+from booking_system.profiling import profiling_samples
+from booking_system.metrics import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,6 +27,8 @@ urlpatterns = [
     path('payment-success/', providers_views.payment_success, name='payment_success'),
     path('payment-cancel/', providers_views.payment_cancel, name='payment_cancel'),
     path('stripe-webhook/', providers_views.stripe_webhook, name='stripe_webhook'),
+    path('profiling/samples/', profiling_samples, name='profiling_samples'),
+    path('metrics/', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ProvidersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'providers'
+
+    def ready(self):
+        # Register the availability cache invalidation receivers
+        import providers.signals
@@ -0,0 +1,121 @@
+# providers/availability.py
+from datetime import timedelta
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+from .conflicts import ACTIVE_APPOINTMENT_STATUSES, OccupancyMap, to_minutes, to_end_minutes, from_minutes
+from .models import ProviderService, WorkingHours, ProviderTimeSlot
+
+
+def split_windows(windows, duration_minutes, gap_minutes=0):
+    """
+    Cuts free windows into back-to-back slots of `duration_minutes`,
+    leaving `gap_minutes` between consecutive slots.
+    """
+    slots = []
+    if duration_minutes <= 0:
+        return slots
+    for start, end in windows:
+        cursor = start
+        while cursor + duration_minutes <= end:
+            slots.append((cursor, cursor + duration_minutes))
+            cursor += duration_minutes + gap_minutes
+    return slots
+
+
+def open_time_slots():
+    """
+    ProviderTimeSlot rows that can still be requested: not marked booked, not
+    referenced by an active appointment and not held by a checkout in progress.
+    """
+    from appointments.models import Appointment
+    from appointments.booking import active_holds
+
+    active = Appointment.objects.filter(time_slot=OuterRef('pk'), status__in=ACTIVE_APPOINTMENT_STATUSES)
+    return ProviderTimeSlot.objects.filter(is_booked=False).exclude(Exists(active)).exclude(Exists(active_holds()))
+
+
+class ProviderSchedule:
+    """
+    A provider's working hours plus an OccupancyMap of their blocked slots and
+    active appointments for a date range. Everything after loading is computed
+    in memory on minute-of-day intervals.
+    """
+
+    def __init__(self, provider, start_date, end_date=None, **occupancy_options):
+        self.provider = provider
+        self.start_date = start_date
+        self.end_date = end_date or start_date
+
+        self.working_hours = {
+            day_of_week: (to_minutes(start), to_end_minutes(end))
+            for day_of_week, start, end in WorkingHours.objects.filter(
+                provider=provider
+            ).values_list('day_of_week', 'start_time', 'end_time')
+        }
+        self.occupancy = OccupancyMap(provider, self.start_date, self.end_date, **occupancy_options)
+
+    def dates(self):
+        day = self.start_date
+        while day <= self.end_date:
+            yield day
+            day += timedelta(days=1)
+
+    def busy_intervals(self, day):
+        return self.occupancy.busy_intervals(day)
+
+    def free_windows(self, day):
+        window = self.working_hours.get(day.weekday())
+        if window is None:
+            return []
+        return self.occupancy.free_intervals(day, window)
+
+    def slots(self, day, duration_minutes, gap_minutes=0):
+        return [
+            (from_minutes(start), from_minutes(end))
+            for start, end in split_windows(self.free_windows(day), duration_minutes, gap_minutes)
+        ]
+
+
+def get_available_windows(provider_service, day):
+    """
+    Returns bookable (start_time, end_time) pairs for a provider service on a
+    single day, sized by the service's duration. Past days have none, and on
+    today only slots that have not started yet are returned.
+    """
+    now = timezone.localtime()
+    if day < now.date():
+        return []
+    schedule = ProviderSchedule(provider_service.provider, day)
+    slots = schedule.slots(day, provider_service.duration_minutes)
+    if day == now.date():
+        slots = [(start, end) for start, end in slots if start > now.time()]
+    return slots
+
+
+def earliest_available(subcategory_id, location_id=None, start_date=None, end_date=None, limit=10):
+    """
+    The `limit` soonest open time slots across every provider offering a
+    service in the subcategory (optionally at a location), as one query
+    ordered by (date, start_time). A provider with several matching services
+    lists each slot once, with the cheapest of them.
+    """
+    # Slot dates and times are wall-clock times in TIME_ZONE.
+    now = timezone.localtime()
+    start_date = max(start_date or now.date(), now.date())
+    services = ProviderService.objects.filter(provider=OuterRef('provider'), sub_category_id=subcategory_id)
+    if location_id:
+        services = services.filter(locations=location_id)
+    cheapest = services.order_by('price', 'pk')[:1]
+    slots = open_time_slots().filter(Exists(services), date__gte=start_date).exclude(
+        date=now.date(), start_time__lte=now.time()
+    )
+    if end_date:
+        slots = slots.filter(date__lte=end_date)
+    return slots.annotate(
+        service_id=Subquery(cheapest.values('pk')),
+        service_name=Subquery(cheapest.values('name')),
+        service_price=Subquery(cheapest.values('price')),
+    ).order_by('date', 'start_time', 'service_price', 'pk').values(
+        'id', 'date', 'start_time', 'end_time', 'service_id', 'service_name', 'service_price',
+        'provider__user__username',
+    )[:limit]
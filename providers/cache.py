@@ -0,0 +1,158 @@
+# providers/cache.py
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+
+# Process-local hit/miss counters, exposed through cache_stats().
+stats = Counter()
+
+# Sentinel provider id for blocks that apply to every provider.
+ALL_PROVIDERS = '*'
+
+
+def get_cache():
+    return caches[settings.AVAILABILITY_CACHE_ALIAS]
+
+
+def _version_key(provider_id, day):
+    return f'availability-version:{provider_id}:{day.isoformat()}'
+
+
+def _schedule_version_key(provider_id):
+    return f'availability-version:{provider_id}:schedule'
+
+
+def _version_keys(provider_id, day):
+    return [_version_key(provider_id, day), _version_key(ALL_PROVIDERS, day), _schedule_version_key(provider_id)]
+
+
+def _seed():
+    # Counters start from the clock, so a cache flush or restart never hands
+    # out a value that an earlier ETag or cache key already used.
+    return time.time_ns()
+
+
+def get_versions(provider_id, day):
+    """
+    Returns the (provider-day, all-providers-day, provider schedule) change
+    counters. Every entry cached for that provider and day embeds all three,
+    so bumping any one makes those entries unreachable.
+    """
+    keys = _version_keys(provider_id, day)
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, _seed(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+async def aget_versions(provider_id, day):
+    """Async get_versions(), for async views."""
+    keys = _version_keys(provider_id, day)
+    cache = get_cache()
+    versions = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            await cache.aadd(key, _seed(), timeout=None)
+        versions.update(await cache.aget_many(missing))
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+def versioned_etag(kind, provider_id, day, versions):
+    """etag() for versions already fetched with get_versions() or aget_versions()."""
+    bucket = int(time.time()) // settings.AVAILABILITY_CACHE_TIMEOUT
+    return f'"{kind}-{provider_id}-{day.isoformat()}-{"-".join(map(str, versions))}-{bucket}"'
+
+
+def etag(kind, provider_id, day):
+    """
+    A strong ETag for (kind, provider, day) built from the change counters
+    alone, without running the availability query. It also rolls over every
+    AVAILABILITY_CACHE_TIMEOUT seconds, because slot holds expire silently.
+    """
+    return versioned_etag(kind, provider_id, day, get_versions(provider_id, day))
+
+
+def invalidate(provider_id, day):
+    """
+    Bumps the change counter for a provider-day. Pass provider_id=None for a
+    change that affects every provider on that day.
+    """
+    _bump(_version_key(ALL_PROVIDERS if provider_id is None else provider_id, day))
+
+
+def invalidate_schedule(provider_id):
+    """
+    Bumps a provider's schedule counter, for changes such as working hours
+    that affect every day of that provider at once.
+    """
+    _bump(_schedule_version_key(provider_id))
+
+
+def _bump(key):
+    cache = get_cache()
+    # Seed the counter if it is missing; cache.incr raises on missing keys.
+    if not cache.add(key, _seed(), timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _seed(), timeout=None)
+
+
+def invalidate_range(provider_id, days):
+    for day in days:
+        invalidate(provider_id, day)
+
+
+def _entry_key(kind, provider_id, day, versions):
+    return f'availability:{kind}:{provider_id}:{day.isoformat()}:{":".join(map(str, versions))}'
+
+
+def get_or_compute(kind, provider_id, day, compute):
+    """
+    Returns the cached value for (kind, provider, day), computing and storing
+    it on a miss.
+    """
+    key = _entry_key(kind, provider_id, day, get_versions(provider_id, day))
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        stats['hits'] += 1
+        return value
+    stats['misses'] += 1
+    value = compute()
+    cache.set(key, value, timeout=settings.AVAILABILITY_CACHE_TIMEOUT)
+    return value
+
+
+async def aget_or_compute(kind, provider_id, day, compute, versions=None):
+    """
+    Async get_or_compute(); `compute` is a coroutine function. Pass the
+    `versions` already fetched for the ETag to save a cache round trip.
+    """
+    versions = versions or await aget_versions(provider_id, day)
+    key = _entry_key(kind, provider_id, day, versions)
+    cache = get_cache()
+    value = await cache.aget(key)
+    if value is not None:
+        stats['hits'] += 1
+        return value
+    stats['misses'] += 1
+    value = await compute()
+    await cache.aset(key, value, timeout=settings.AVAILABILITY_CACHE_TIMEOUT)
+    return value
+
+
+def cache_stats():
+    hits, misses = stats['hits'], stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
@@ -0,0 +1,116 @@
+# providers/conflicts.py
+from datetime import time
+from django.db.models import Q
+from .models import BlockedSlot, ProviderTimeSlot
+
+# Appointment statuses that occupy a provider's time.
+ACTIVE_APPOINTMENT_STATUSES = ('pending', 'approved', 'paid')
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def to_end_minutes(t):
+    # An end time of 00:00 closes the day rather than opening it.
+    return to_minutes(t) or MINUTES_PER_DAY
+
+
+def from_minutes(m):
+    return time((m // 60) % 24, m % 60)
+
+
+def interval_mask(start, end):
+    """
+    Bitmask with one bit set for every minute in [start, end).
+    """
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def mask_to_intervals(bits):
+    """
+    Yields (start, end) minute intervals for each run of set bits.
+    """
+    while bits:
+        start = (bits & -bits).bit_length() - 1
+        run = bits >> start
+        length = (~run & (run + 1)).bit_length() - 1
+        yield start, start + length
+        bits &= ~interval_mask(start, start + length)
+
+
+class OccupancyMap:
+    """
+    Minute-resolution occupancy for one provider over a date range: one Python
+    int of 1440 bits per day. Appointments, blocked slots and (optionally)
+    existing time slots are loaded with a single UNION query, after which any
+    number of candidate intervals can be checked without touching the database.
+    """
+
+    def __init__(self, provider, start_date, end_date=None, appointments=True,
+                 blocked_slots=True, time_slots=False, exclude_time_slot=None):
+        from appointments.models import Appointment
+
+        self.provider = provider
+        self.start_date = start_date
+        self.end_date = end_date or start_date
+        self.days = {}
+
+        date_range = (self.start_date, self.end_date)
+        sources = []
+        if appointments:
+            qs = Appointment.objects.filter(
+                provider=provider,
+                date__range=date_range,
+                status__in=ACTIVE_APPOINTMENT_STATUSES,
+            )
+            if exclude_time_slot is not None:
+                qs = qs.exclude(time_slot=exclude_time_slot)
+            sources.append(qs.order_by().values_list('date', 'time_slot__start_time', 'time_slot__end_time'))
+        if blocked_slots:
+            sources.append(BlockedSlot.objects.filter(
+                Q(provider=provider) | Q(provider__isnull=True),
+                date__range=date_range,
+            ).order_by().values_list('date', 'start_time', 'end_time'))
+        if time_slots:
+            qs = ProviderTimeSlot.objects.filter(provider=provider, date__range=date_range)
+            if exclude_time_slot is not None:
+                qs = qs.exclude(pk=exclude_time_slot.pk)
+            sources.append(qs.order_by().values_list('date', 'start_time', 'end_time'))
+
+        if sources:
+            rows = sources[0].union(*sources[1:], all=True) if len(sources) > 1 else sources[0]
+            for day, start, end in rows:
+                self.occupy(day, start, end)
+
+    def occupy(self, day, start_time, end_time):
+        self.days[day] = self.days.get(day, 0) | interval_mask(to_minutes(start_time), to_end_minutes(end_time))
+
+    def overlaps(self, day, start_time, end_time):
+        return bool(self.days.get(day, 0) & interval_mask(to_minutes(start_time), to_end_minutes(end_time)))
+
+    def find_conflicts(self, candidates):
+        """
+        Returns the (day, start_time, end_time) candidates that overlap existing
+        occupancy or an earlier candidate in the same batch.
+        """
+        conflicts = []
+        for day, start_time, end_time in candidates:
+            if self.overlaps(day, start_time, end_time):
+                conflicts.append((day, start_time, end_time))
+            else:
+                self.occupy(day, start_time, end_time)
+        return conflicts
+
+    def busy_intervals(self, day):
+        return list(mask_to_intervals(self.days.get(day, 0)))
+
+    def free_intervals(self, day, window):
+        """
+        Free (start, end) minute intervals inside a (start, end) minute window.
+        """
+        return list(mask_to_intervals(interval_mask(*window) & ~self.days.get(day, 0)))
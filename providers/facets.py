@@ -0,0 +1,91 @@
+# providers/facets.py
+from django.db.models import Count, Q
+from .models import ProviderService
+
+# Half-open [low, high) ranges; None means unbounded.
+PRICE_BUCKETS = ((None, 25), (25, 50), (50, 100), (100, None))
+DURATION_BUCKETS = ((None, 30), (30, 60), (60, 120), (120, None))
+
+LocationLink = ProviderService.locations.through
+
+
+def bucket_label(bucket, format_value):
+    low, high = bucket
+    if low is None:
+        return f'Under {format_value(high)}'
+    if high is None:
+        return f'{format_value(low)}+'
+    return f'{format_value(low)} – {format_value(high)}'
+
+
+def _bucket_from(params, name, buckets):
+    try:
+        index = int(params.get(name, ''))
+    except ValueError:
+        return None
+    return index if 0 <= index < len(buckets) else None
+
+
+def parse_filters(params):
+    """Facet selections from request parameters; unknown values are ignored."""
+    locations = []
+    for value in params.getlist('location'):
+        try:
+            locations.append(int(value))
+        except ValueError:
+            pass
+    return {
+        'locations': locations,
+        'price': _bucket_from(params, 'price', PRICE_BUCKETS),
+        'duration': _bucket_from(params, 'duration', DURATION_BUCKETS),
+    }
+
+
+def _range_q(field, bucket):
+    low, high = bucket
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__lt': high})
+    return condition
+
+
+def apply_filters(queryset, filters, skip=None):
+    """
+    Narrows `queryset` by every selected facet except `skip`. Locations are
+    matched with an id subquery on the through table, so a service offered in
+    several selected locations is not duplicated.
+    """
+    if filters['locations'] and skip != 'locations':
+        queryset = queryset.filter(pk__in=LocationLink.objects.filter(
+            servicelocation_id__in=filters['locations'],
+        ).values('providerservice_id'))
+    if filters['price'] is not None and skip != 'price':
+        queryset = queryset.filter(_range_q('price', PRICE_BUCKETS[filters['price']]))
+    if filters['duration'] is not None and skip != 'duration':
+        queryset = queryset.filter(_range_q('duration_minutes', DURATION_BUCKETS[filters['duration']]))
+    return queryset
+
+
+def _bucket_counts(queryset, field, buckets):
+    counts = queryset.aggregate(**{
+        f'bucket_{i}': Count('pk', filter=_range_q(field, bucket)) for i, bucket in enumerate(buckets)
+    })
+    return [counts[f'bucket_{i}'] for i in range(len(buckets))]
+
+
+def facet_counts(queryset, filters):
+    """
+    Counts per facet value with one aggregate query per facet group. Each
+    group is counted with the other groups' selections applied but not its
+    own, so picking one location still shows how many match the others.
+    """
+    location_rows = LocationLink.objects.filter(
+        providerservice_id__in=apply_filters(queryset, filters, skip='locations').values('pk'),
+    ).values('servicelocation_id').annotate(count=Count('providerservice_id')).order_by()
+    return {
+        'locations': {row['servicelocation_id']: row['count'] for row in location_rows},
+        'price': _bucket_counts(apply_filters(queryset, filters, skip='price'), 'price', PRICE_BUCKETS),
+        'duration': _bucket_counts(apply_filters(queryset, filters, skip='duration'), 'duration_minutes', DURATION_BUCKETS),
+    }
@@ -0,0 +1,102 @@
+# providers/fake_stripe.py
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+SESSION_PATH = re.compile(r'^/v1/checkout/sessions/(?P<id>[\w-]+)$')
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    """
+    Implements just enough of the Stripe API for the checkout flow:
+    creating and retrieving checkout sessions.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.server.request_log.append(('POST', self.path))
+        time.sleep(self.server.latency)
+        if self.path != '/v1/checkout/sessions':
+            return self._send(404, {'error': {'type': 'invalid_request_error', 'message': f'Unrecognized request URL (POST: {self.path}).'}})
+
+        length = int(self.headers.get('Content-Length') or 0)
+        params = parse_qsl(self.rfile.read(length).decode())
+        metadata = {key[len('metadata['):-1]: value for key, value in params if key.startswith('metadata[')}
+        fields = dict(params)
+        session_id = f'cs_test_{uuid.uuid4().hex}'
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'mode': fields.get('mode', 'payment'),
+            'status': 'open',
+            'payment_status': 'unpaid',
+            'expires_at': int(fields.get('expires_at') or time.time() + 24 * 3600),
+            'success_url': fields.get('success_url'),
+            'cancel_url': fields.get('cancel_url'),
+            'metadata': metadata,
+            'url': f'http://{self.server.server_address[0]}:{self.server.server_address[1]}/pay/{session_id}',
+        }
+        self.server.sessions[session_id] = session
+        self._send(200, session)
+
+    def do_GET(self):
+        self.server.request_log.append(('GET', self.path))
+        time.sleep(self.server.latency)
+        match = SESSION_PATH.match(self.path)
+        session_id = match.group('id') if match else ''
+        session = self.server.sessions.get(session_id)
+        if session is None:
+            return self._send(404, {'error': {'type': 'invalid_request_error', 'message': f"No such checkout.session: '{session_id}'"}})
+        self._send(200, session)
+
+
+class FakeStripeServer(ThreadingHTTPServer):
+    """
+    A local stand-in for api.stripe.com. Point settings.STRIPE_API_BASE at
+    `server.url` to exercise the checkout views without network access.
+    `latency` (seconds) is added to every response, to mimic a real round trip.
+    """
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0):
+        super().__init__((host, port), FakeStripeHandler)
+        self.latency = latency
+        self.sessions = {}
+        self.request_log = []
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serves from a background thread; returns the thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def serve(latency, ready):
+    """Child-process entry point: runs a server and sends its URL through `ready`."""
+    server = FakeStripeServer(latency=latency)
+    ready.send(server.url)
+    server.serve_forever()
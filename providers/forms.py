@@ -2,6 +2,34 @@
 from django import forms
 from .models import ServiceProvider, ProviderService, ServiceLocation, WorkingHours, BlockedSlot, ProviderTimeSlot
 from services.models import ServiceCategory, ServiceSubCategory, Service
+from services.catalog import get_catalog
+
+
+class SnapshotChoiceIterator(forms.models.ModelChoiceIterator):
+    # Renders choices from catalog snapshot objects instead of running the
+    # field's queryset; the queryset is still used to validate submissions.
+    def __init__(self, field, objects):
+        super().__init__(field)
+        self.objects = objects
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.objects:
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.objects) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.objects)
+
+
+def use_snapshot_choices(field, queryset, objects):
+    field.queryset = queryset
+    field.iterator = lambda field: SnapshotChoiceIterator(field, objects)
+    field.widget.choices = field.choices
+
 
 class ProviderServiceForm(forms.ModelForm):
     # These fields are defined for dynamic behavior.
@@ -30,32 +58,38 @@ class ProviderServiceForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        catalog = get_catalog()
+        use_snapshot_choices(self.fields['category'], ServiceCategory.objects.all(), catalog.categories)
+        subcategories = ServiceSubCategory.objects.all()
+        subcategory_choices = catalog.subcategories
         # If the form is being initialized with an existing instance (for editing),
         # set the initial values.
         if self.instance and self.instance.pk:
-            self.fields['category'].initial = self.instance.sub_category.category
-            self.fields['sub_category'].initial = self.instance.sub_category
+            sub_category = catalog.subcategory_by_id.get(self.instance.sub_category_id) or self.instance.sub_category
+            self.fields['category'].initial = sub_category.category
+            self.fields['sub_category'].initial = sub_category
             
             # Populate the sub_category queryset based on the instance's category
-            self.fields['sub_category'].queryset = ServiceSubCategory.objects.filter(
-                category=self.instance.sub_category.category
-            ).order_by('name')
+            subcategories = subcategories.filter(category_id=sub_category.category_id)
+            subcategory_choices = catalog.subcategories_of(sub_category.category_id)
         # This handles the AJAX request when the category is changed
         elif 'category' in self.data:
             try:
                 category_id = int(self.data.get('category'))
-                self.fields['sub_category'].queryset = ServiceSubCategory.objects.filter(
-                    category_id=category_id
-                ).order_by('name')
+                subcategories = subcategories.filter(category_id=category_id)
+                subcategory_choices = catalog.subcategories_of(category_id)
             except (ValueError, TypeError):
                 pass
         
         # Fallback: if no instance or no category is selected, show all subcategories.
         # This also applies to the initial load of the "add new service" form.
-        else:
-            self.fields['sub_category'].queryset = ServiceSubCategory.objects.all().order_by('name')
+        use_snapshot_choices(
+            self.fields['sub_category'],
+            subcategories.order_by('name'),
+            sorted(subcategory_choices, key=lambda subcategory: subcategory.name),
+        )
         # Ensure locations queryset is always set
-        self.fields['locations'].queryset = ServiceLocation.objects.all()
+        use_snapshot_choices(self.fields['locations'], ServiceLocation.objects.all(), catalog.locations)
 
 
 
@@ -105,4 +139,27 @@ class ProviderServiceEditForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['locations'].queryset = ServiceLocation.objects.all()
\ No newline at end of file
+        use_snapshot_choices(self.fields['locations'], ServiceLocation.objects.all(), get_catalog().locations)
+
+class BulkTimeSlotForm(forms.Form):
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    slot_minutes = forms.IntegerField(
+        min_value=5, max_value=720, initial=60, label="Slot length (minutes)",
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    gap_minutes = forms.IntegerField(
+        min_value=0, max_value=240, initial=0, label="Gap between slots (minutes)",
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date:
+            if end_date < start_date:
+                raise forms.ValidationError("End date must be on or after the start date.")
+            if (end_date - start_date).days > 366:
+                raise forms.ValidationError("You can generate at most one year of time slots at a time.")
+        return cleaned_data
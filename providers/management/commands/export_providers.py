@@ -0,0 +1,42 @@
+# providers/management/commands/export_providers.py
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from providers.transfer import RECORD_TYPES, export_records, write_csv, write_jsonl
+
+
+class Command(BaseCommand):
+    help = "Exports providers, services, working hours and time slots as JSONL or CSV, streaming from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, or '-' for stdout.")
+        parser.add_argument('--format', choices=['jsonl', 'csv'], help="Defaults to the file extension.")
+        parser.add_argument('--type', choices=RECORD_TYPES, action='append', dest='types',
+                            help="Record type to export; repeatable. Defaults to all (JSONL) and required for CSV.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        output_format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        types = options['types'] or list(RECORD_TYPES)
+        if output_format == 'csv' and len(options['types'] or []) != 1:
+            raise CommandError("CSV export needs exactly one --type.")
+
+        stream = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        started = time.perf_counter()
+        total = 0
+        try:
+            for record_type in RECORD_TYPES:
+                if record_type not in types:
+                    continue
+                records = export_records(record_type, chunk_size=options['chunk_size'])
+                write = write_csv if output_format == 'csv' else write_jsonl
+                count = write(stream, record_type, records)
+                total += count
+                self.stderr.write(f"{record_type}: {count} exported")
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        self.stderr.write(self.style.SUCCESS(f"Exported {total} records in {elapsed:.2f}s ({rate:,.0f} records/s)."))
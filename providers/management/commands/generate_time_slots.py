@@ -0,0 +1,44 @@
+# providers/management/commands/generate_time_slots.py
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from providers.models import ServiceProvider
+from providers.slots import generate_time_slots
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Generates recurring time slots for a provider from their working hours over a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument('provider', help="Username of the service provider.")
+        parser.add_argument('start_date', type=parse_date, help="First day (YYYY-MM-DD).")
+        parser.add_argument('end_date', type=parse_date, help="Last day, inclusive (YYYY-MM-DD).")
+        parser.add_argument('--slot-minutes', type=int, default=60, help="Length of each slot in minutes.")
+        parser.add_argument('--gap-minutes', type=int, default=0, help="Gap between consecutive slots in minutes.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk_create batch.")
+
+    def handle(self, *args, **options):
+        try:
+            provider = ServiceProvider.objects.select_related('user').get(user__username=options['provider'])
+        except ServiceProvider.DoesNotExist:
+            raise CommandError(f"Service provider '{options['provider']}' does not exist.")
+        if options['end_date'] < options['start_date']:
+            raise CommandError("end_date must be on or after start_date.")
+        if options['slot_minutes'] <= 0 or options['gap_minutes'] < 0:
+            raise CommandError("--slot-minutes must be positive and --gap-minutes must not be negative.")
+
+        created = generate_time_slots(
+            provider,
+            options['start_date'],
+            options['end_date'],
+            options['slot_minutes'],
+            options['gap_minutes'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {created} time slots for {provider}."))
@@ -0,0 +1,53 @@
+# providers/management/commands/import_providers.py
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from providers.transfer import RECORD_TYPES, Importer, RecordError, read_csv, read_jsonl
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports providers, services, working hours and time slots from JSONL "
+        "(one record per line with a 'type' key) or CSV (one record type per file)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin.")
+        parser.add_argument('--format', choices=['jsonl', 'csv'], help="Defaults to the file extension.")
+        parser.add_argument('--type', choices=RECORD_TYPES, help="Record type of every row; required for CSV.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per bulk_create batch and transaction.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        if input_format == 'csv' and not options['type']:
+            raise CommandError("--type is required for CSV input.")
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size must be positive.")
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        importer = Importer(batch_size=options['batch_size'])
+        started = time.perf_counter()
+        try:
+            records = read_csv(stream, options['type']) if input_format == 'csv' else read_jsonl(stream)
+            for line, record in records:
+                if options['type'] and input_format == 'jsonl':
+                    record.setdefault('type', options['type'])
+                importer.add(line, record)
+            importer.finish()
+        except RecordError as e:
+            # Batches flushed before the bad record stay committed.
+            raise CommandError(f"{e}. Written so far: {dict(importer.written)}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - started
+
+        total = sum(importer.written.values())
+        for record_type in RECORD_TYPES:
+            if importer.written[record_type] or importer.skipped[record_type]:
+                self.stdout.write(
+                    f"{record_type}: {importer.written[record_type]} written, {importer.skipped[record_type]} skipped"
+                )
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f"Imported {total} records in {elapsed:.2f}s ({rate:,.0f} records/s)."))
@@ -0,0 +1,20 @@
+# providers/management/commands/rebuild_search_index.py
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from providers import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the provider service full-text search index from scratch."
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING(
+                f"The {connection.vendor} backend has no search index; searches fall back to icontains."
+            ))
+            return
+        started = time.perf_counter()
+        count = search.rebuild_index()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} provider services in {elapsed:.2f}s."))
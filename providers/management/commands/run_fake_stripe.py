@@ -0,0 +1,22 @@
+# providers/management/commands/run_fake_stripe.py
+from django.core.management.base import BaseCommand
+from providers.fake_stripe import FakeStripeServer
+
+
+class Command(BaseCommand):
+    help = "Runs a local fake Stripe API for checkout development. Set STRIPE_API_BASE to the printed URL."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency-ms', type=int, default=0, help="Delay added to every response.")
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(options['host'], options['port'], latency=options['latency_ms'] / 1000)
+        self.stdout.write(self.style.SUCCESS(f"Fake Stripe API listening on {server.url}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
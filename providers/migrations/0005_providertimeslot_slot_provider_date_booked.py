@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0004_providertimeslot_unique_provider_time_slot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='providertimeslot',
+            index=models.Index(fields=['provider', 'date', 'is_booked', 'start_time'], name='slot_provider_date_booked'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0005_providertimeslot_slot_provider_date_booked'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='providertimeslot',
+            index=models.Index(fields=['is_booked', 'date', 'start_time'], name='slot_booked_date_start'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE providers_service_search USING fts5(
+        name, description, subcategory, provider,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO providers_service_search (rowid, name, description, subcategory, provider)
+    SELECT ps.id, ps.name, ps.description, sc.name, u.username
+    FROM providers_providerservice ps
+    JOIN services_servicesubcategory sc ON sc.id = ps.sub_category_id
+    JOIN providers_serviceprovider sp ON sp.id = ps.provider_id
+    JOIN auth_user u ON u.id = sp.user_id
+    """,
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE TABLE providers_service_search (
+        service_id bigint PRIMARY KEY
+            REFERENCES providers_providerservice (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX providers_service_search_document ON providers_service_search USING GIN (document)",
+    """
+    INSERT INTO providers_service_search (service_id, document)
+    SELECT ps.id,
+        setweight(to_tsvector('english', coalesce(ps.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(sc.name, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(u.username, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(ps.description, '')), 'C')
+    FROM providers_providerservice ps
+    JOIN services_servicesubcategory sc ON sc.id = ps.sub_category_id
+    JOIN providers_serviceprovider sp ON sp.id = ps.provider_id
+    JOIN auth_user u ON u.id = sp.user_id
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS providers_service_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0006_providertimeslot_slot_booked_date_start'),
+        ('services', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
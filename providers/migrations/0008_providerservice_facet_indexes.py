@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0007_service_search_index'),
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='providerservice',
+            index=models.Index(fields=['sub_category', 'price'], name='service_subcategory_price'),
+        ),
+        migrations.AddIndex(
+            model_name='providerservice',
+            index=models.Index(fields=['sub_category', 'duration_minutes'], name='service_subcategory_duration'),
+        ),
+    ]
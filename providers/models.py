@@ -21,6 +21,11 @@ class ServiceLocation(models.Model):
     def __str__(self):
         return self.name
 
+class ProviderServiceQuerySet(models.QuerySet):
+    def for_listing(self):
+        # Provider name and location badges are shown on every service card.
+        return self.select_related('provider__user', 'sub_category').prefetch_related('locations')
+
 class ProviderService(models.Model):
     service = models.ForeignKey('services.Service', on_delete=models.CASCADE, related_name='provider_details')
     provider = models.ForeignKey(ServiceProvider, on_delete=models.CASCADE, related_name='service_offerings')
@@ -32,6 +37,15 @@ class ProviderService(models.Model):
     image = models.ImageField(upload_to='provider_service_images/')
     locations = models.ManyToManyField(ServiceLocation, related_name='providers')
 
+    objects = ProviderServiceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Facet counts and range filters within a subcategory listing.
+            models.Index(fields=['sub_category', 'price'], name='service_subcategory_price'),
+            models.Index(fields=['sub_category', 'duration_minutes'], name='service_subcategory_duration'),
+        ]
+
     def __str__(self):
         return f"{self.name} by {self.provider.user.username}"
 
@@ -49,6 +63,11 @@ class ProviderTimeSlot(models.Model):
                 name='unique_provider_time_slot'
             )
         ]
+        indexes = [
+            models.Index(fields=['provider', 'date', 'is_booked', 'start_time'], name='slot_provider_date_booked'),
+            # Cross-provider "first available" search walks open slots in time order.
+            models.Index(fields=['is_booked', 'date', 'start_time'], name='slot_booked_date_start'),
+        ]
 
     def __str__(self):
         return f"{self.provider.user.username} on {self.date} from {self.start_time} to {self.end_time}"
@@ -0,0 +1,192 @@
+# providers/search.py
+import re
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import ProviderService
+
+# Side table holding one search document per ProviderService. On SQLite it is
+# an FTS5 virtual table keyed by rowid; on Postgres a tsvector column with a
+# GIN index (see migration 0007).
+TABLE = 'providers_service_search'
+
+# Long queries are truncated rather than turned into huge MATCH expressions.
+MAX_TERMS = 8
+
+# Index writes are chunked to stay under the SQLite bound-parameter limit.
+CHUNK_SIZE = 500
+
+_SQLITE_REBUILD = f"""
+    INSERT INTO {TABLE} (rowid, name, description, subcategory, provider)
+    SELECT ps.id, ps.name, ps.description, sc.name, u.username
+    FROM providers_providerservice ps
+    JOIN services_servicesubcategory sc ON sc.id = ps.sub_category_id
+    JOIN providers_serviceprovider sp ON sp.id = ps.provider_id
+    JOIN auth_user u ON u.id = sp.user_id
+"""
+
+_POSTGRES_DOCUMENT = """
+    setweight(to_tsvector('english', coalesce({name}, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({subcategory}, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({provider}, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({description}, '')), 'C')
+"""
+
+_POSTGRES_REBUILD = f"""
+    INSERT INTO {TABLE} (service_id, document)
+    SELECT ps.id, {_POSTGRES_DOCUMENT.format(name='ps.name', subcategory='sc.name', provider='u.username', description='ps.description')}
+    FROM providers_providerservice ps
+    JOIN services_servicesubcategory sc ON sc.id = ps.sub_category_id
+    JOIN providers_serviceprovider sp ON sp.id = ps.provider_id
+    JOIN auth_user u ON u.id = sp.user_id
+"""
+
+
+def is_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _key_column():
+    return 'rowid' if connection.vendor == 'sqlite' else 'service_id'
+
+
+def _chunks(values):
+    values = list(values)
+    for i in range(0, len(values), CHUNK_SIZE):
+        yield values[i:i + CHUNK_SIZE]
+
+
+def remove_services(ids):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {TABLE} WHERE {_key_column()} IN ({placeholders})', chunk)
+
+
+def index_services(ids):
+    """
+    (Re)writes the search documents for the given ProviderService ids. Ids
+    that no longer exist are dropped from the index.
+    """
+    if not is_supported():
+        return
+    if connection.vendor == 'sqlite':
+        insert = f'INSERT INTO {TABLE} (rowid, name, description, subcategory, provider) VALUES (%s, %s, %s, %s, %s)'
+    else:
+        document = _POSTGRES_DOCUMENT.format(name='%s', subcategory='%s', provider='%s', description='%s')
+        insert = f'INSERT INTO {TABLE} (service_id, document) VALUES (%s, {document})'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for chunk in _chunks(ids):
+            rows = ProviderService.objects.filter(pk__in=chunk).values_list(
+                'pk', 'name', 'description', 'sub_category__name', 'provider__user__username',
+            )
+            remove_services(chunk)
+            if connection.vendor == 'sqlite':
+                params = list(rows)
+            else:
+                params = [(pk, name, subcategory, provider, description) for pk, name, description, subcategory, provider in rows]
+            cursor.executemany(insert, params)
+
+
+def rebuild_index():
+    """Replaces the whole index with one INSERT ... SELECT and returns the row count."""
+    if not is_supported():
+        return 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(_SQLITE_REBUILD if connection.vendor == 'sqlite' else _POSTGRES_REBUILD)
+        if connection.vendor == 'sqlite':
+            # Merge the freshly written segments so queries touch one b-tree.
+            cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _match_param(words):
+    # Every term must match, each as a prefix so results appear while typing.
+    if connection.vendor == 'sqlite':
+        return ' '.join(f'"{word}"*' for word in words)
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def _ids_sql(words):
+    """Returns (sql, params) selecting the ids of every matching document, unordered."""
+    if connection.vendor == 'sqlite':
+        return f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [_match_param(words)]
+    return f"SELECT service_id FROM {TABLE} WHERE document @@ to_tsquery('english', %s)", [_match_param(words)]
+
+
+def _ranked_sql(words):
+    """Returns (sql, params) selecting (id, rank) for matching documents, best first."""
+    if connection.vendor == 'sqlite':
+        # bm25() weights follow the column order: name, description, subcategory, provider.
+        # Lower scores rank higher.
+        return (
+            f'SELECT rowid, bm25({TABLE}, 10.0, 1.0, 4.0, 4.0) AS rank FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s ORDER BY rank, rowid',
+            [_match_param(words)],
+        )
+    return (
+        f"SELECT service_id, ts_rank_cd(document, query) AS rank "
+        f"FROM {TABLE}, to_tsquery('english', %s) query "
+        f"WHERE document @@ query ORDER BY rank DESC, service_id",
+        [_match_param(words)],
+    )
+
+
+def matching_ids(query, limit=None, offset=0):
+    """Ids of services matching `query`, best match first."""
+    words = terms(query)
+    if not words:
+        return []
+    if not is_supported():
+        condition = Q()
+        for word in words:
+            condition &= (
+                Q(name__icontains=word) | Q(description__icontains=word)
+                | Q(sub_category__name__icontains=word) | Q(provider__user__username__icontains=word)
+            )
+        queryset = ProviderService.objects.filter(condition).order_by('name', 'pk').values_list('pk', flat=True)
+        return list(queryset[offset:offset + limit] if limit is not None else queryset[offset:])
+
+    sql, params = _ranked_sql(words)
+    if limit is not None:
+        sql += ' LIMIT %s OFFSET %s'
+        params += [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_matching(queryset, query):
+    """
+    Narrows a ProviderService queryset to search matches with an id subquery,
+    for callers such as the admin that order and paginate results themselves.
+    """
+    words = terms(query)
+    if not words:
+        return queryset
+    if not is_supported():
+        return queryset.filter(pk__in=matching_ids(query))
+    return queryset.filter(pk__in=RawSQL(*_ids_sql(words)))
+
+
+def search_services(query, page=1, page_size=20):
+    """
+    Returns (services, has_next) for one page of ranked results. The index
+    query fetches one extra id to detect the next page; the page itself is
+    loaded with a single for_listing() query.
+    """
+    offset = (page - 1) * page_size
+    ids = matching_ids(query, limit=page_size + 1, offset=offset)
+    has_next = len(ids) > page_size
+    ids = ids[:page_size]
+    services = ProviderService.objects.for_listing().in_bulk(ids)
+    return [services[pk] for pk in ids if pk in services], has_next
@@ -0,0 +1,94 @@
+# providers/signals.py
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import ProviderService, ProviderTimeSlot, BlockedSlot, WorkingHours
+from . import cache, search
+
+
+@receiver(pre_save, sender=ProviderTimeSlot)
+@receiver(pre_save, sender=BlockedSlot)
+@receiver(pre_save, sender='appointments.Appointment')
+def remember_previous_day(sender, instance, update_fields=None, **kwargs):
+    """
+    Records the provider-day an existing row is saved away from, so a slot
+    moved to another date (or provider) also invalidates the day it left.
+    """
+    instance._previous_day = None
+    if instance.pk is None or (update_fields is not None and not {'date', 'provider'} & set(update_fields)):
+        return
+    instance._previous_day = sender._base_manager.filter(pk=instance.pk).values_list('provider_id', 'date').first()
+
+
+def _invalidate_on_commit(instance):
+    # Waits for commit so readers cannot re-cache the old rows.
+    days = {(instance.provider_id, instance.date)}
+    if getattr(instance, '_previous_day', None):
+        days.add(instance._previous_day)
+
+    def invalidate():
+        for provider_id, day in days:
+            cache.invalidate(provider_id, day)
+    transaction.on_commit(invalidate)
+
+
+@receiver([post_save, post_delete], sender=ProviderTimeSlot)
+@receiver([post_save, post_delete], sender=BlockedSlot)
+def invalidate_slot_availability(sender, instance, **kwargs):
+    """
+    Drops cached availability for the provider-day a slot or block belongs
+    to, and for the one it moved from. General blocks (no provider)
+    invalidate that day for every provider.
+    """
+    _invalidate_on_commit(instance)
+
+
+@receiver([post_save, post_delete], sender='appointments.Appointment')
+def invalidate_appointment_availability(sender, instance, **kwargs):
+    _invalidate_on_commit(instance)
+
+
+@receiver([post_save, post_delete], sender=WorkingHours)
+def invalidate_schedule_availability(sender, instance, **kwargs):
+    # Working hours repeat weekly, so every day of the provider is affected.
+    transaction.on_commit(lambda: cache.invalidate_schedule(instance.provider_id))
+
+
+@receiver([post_save, post_delete], sender='appointments.SlotHold')
+def invalidate_hold_availability(sender, instance, **kwargs):
+    time_slot = ProviderTimeSlot.objects.filter(pk=instance.time_slot_id).values_list('provider_id', 'date').first()
+    if time_slot:
+        transaction.on_commit(lambda: cache.invalidate(*time_slot))
+
+
+@receiver(post_save, sender=ProviderService)
+def index_provider_service(sender, instance, **kwargs):
+    transaction.on_commit(lambda: search.index_services([instance.pk]))
+
+
+@receiver(post_delete, sender=ProviderService)
+def unindex_provider_service(sender, instance, **kwargs):
+    # Read now: Model.delete() sets instance.pk to None before the commit.
+    pk = instance.pk
+    transaction.on_commit(lambda: search.remove_services([pk]))
+
+
+@receiver(post_save, sender='services.ServiceSubCategory')
+def reindex_subcategory_services(sender, instance, created, **kwargs):
+    # Documents embed the subcategory name.
+    if created:
+        return
+    ids = list(ProviderService.objects.filter(sub_category=instance).values_list('pk', flat=True))
+    if ids:
+        transaction.on_commit(lambda: search.index_services(ids))
+
+
+@receiver(post_save, sender=User)
+def reindex_provider_user_services(sender, instance, created, update_fields=None, **kwargs):
+    # Documents embed the provider username; logins only touch last_login.
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    ids = list(ProviderService.objects.filter(provider__user=instance).values_list('pk', flat=True))
+    if ids:
+        transaction.on_commit(lambda: search.index_services(ids))
@@ -0,0 +1,57 @@
+# providers/slots.py
+from datetime import date
+from .availability import ProviderSchedule
+from .models import ProviderTimeSlot
+from . import cache
+
+
+def generate_time_slots(provider, start_date, end_date, slot_minutes, gap_minutes=0, batch_size=500):
+    """
+    Creates ProviderTimeSlot rows for every free window between start_date and
+    end_date (inclusive). Working hours are loaded with one query and blocked
+    slots, appointments and existing slots for the whole range with another;
+    conflicting candidates are dropped in memory and the rest are written with
+    bulk_create.
+
+    Returns the number of slots created.
+    """
+    start_date = max(start_date, date.today())
+    if end_date < start_date:
+        return 0
+
+    # Existing slots count as occupied so regenerating a range never overlaps them.
+    schedule = ProviderSchedule(provider, start_date, end_date, time_slots=True)
+
+    created = 0
+    batch = []
+    for day in schedule.dates():
+        for start_time, end_time in schedule.slots(day, slot_minutes, gap_minutes):
+            batch.append(ProviderTimeSlot(
+                provider=provider,
+                date=day,
+                start_time=start_time,
+                end_time=end_time,
+            ))
+            if len(batch) >= batch_size:
+                created += _flush(batch, schedule.occupancy)
+                batch = []
+    if batch:
+        created += _flush(batch, schedule.occupancy)
+    # bulk_create skips post_save, so drop cached availability for the range by hand.
+    cache.invalidate_range(provider.pk, schedule.dates())
+    return created
+
+
+def _flush(batch, occupancy):
+    """
+    Inserts the slots of `batch` that are still free in `occupancy`, which
+    already holds every existing slot of the range, and returns how many.
+    """
+    candidates = [(slot.date, slot.start_time, slot.end_time) for slot in batch]
+    # find_conflicts() also marks the new slots as occupied.
+    conflicts = set(occupancy.find_conflicts(candidates))
+    new = [slot for slot, key in zip(batch, candidates) if key not in conflicts]
+    # unique_provider_time_slot stays authoritative if another request
+    # inserts the same slot meanwhile.
+    ProviderTimeSlot.objects.bulk_create(new, ignore_conflicts=True)
+    return len(new)
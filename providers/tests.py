@@ -1,3 +1,499 @@
-from django.test import TestCase
+# providers/tests.py
+from decimal import Decimal
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.contrib.auth.models import User
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from appointments.models import Appointment
+from appointments.tests import make_client, make_provider_service
+from .models import ServiceProvider, ProviderService, WorkingHours, ProviderTimeSlot, BlockedSlot, ServiceLocation
+from .conflicts import OccupancyMap, interval_mask, mask_to_intervals
+from .availability import ProviderSchedule, earliest_available, get_available_windows, split_windows
+from .slots import generate_time_slots, _flush
+from .transfer import Importer
+from . import cache, facets, search
 
-# Create your tests here.
+
+def make_provider(username='provider'):
+    provider = ServiceProvider.objects.create(user=User.objects.create_user(username))
+    for day_of_week in range(7):
+        WorkingHours.objects.create(provider=provider, day_of_week=day_of_week, start_time=time(9), end_time=time(12))
+    return provider
+
+
+def make_appointment(provider_service, slot, status='pending'):
+    return Appointment.objects.create(
+        client=make_client(f'client{slot.pk}'), provider_service=provider_service,
+        time_slot=slot, date=slot.date, status=status,
+    )
+
+
+class GenerateTimeSlotsTests(TestCase):
+    def setUp(self):
+        self.provider = make_provider()
+        self.start = date.today() + timedelta(days=1)
+        self.end = self.start + timedelta(days=2)
+
+    def test_rerun_reports_no_new_slots(self):
+        self.assertEqual(generate_time_slots(self.provider, self.start, self.end, 60), 9)
+        self.assertEqual(generate_time_slots(self.provider, self.start, self.end, 60), 0)
+        self.assertEqual(ProviderTimeSlot.objects.filter(provider=self.provider).count(), 9)
+
+    def test_schedule_is_loaded_once_for_the_range(self):
+        # Working hours and occupancy, then one INSERT per batch of two.
+        with self.assertNumQueries(2 + 5):
+            self.assertEqual(generate_time_slots(self.provider, self.start, self.end, 60, batch_size=2), 9)
+
+    def test_flush_does_not_count_existing_rows(self):
+        ProviderTimeSlot.objects.create(provider=self.provider, date=self.start, start_time=time(9), end_time=time(10))
+        batch = [
+            ProviderTimeSlot(provider=self.provider, date=self.start, start_time=time(9), end_time=time(10)),
+            ProviderTimeSlot(provider=self.provider, date=self.start, start_time=time(10), end_time=time(11)),
+        ]
+        occupancy = OccupancyMap(self.provider, self.start, time_slots=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(_flush(batch, occupancy), 1)
+        self.assertEqual(ProviderTimeSlot.objects.filter(provider=self.provider).count(), 2)
+
+
+class SlotInvalidationTests(TestCase):
+    def test_moving_a_slot_invalidates_both_days(self):
+        provider = make_provider()
+        old_day = date.today() + timedelta(days=1)
+        new_day = old_day + timedelta(days=1)
+        slot = ProviderTimeSlot.objects.create(provider=provider, date=old_day, start_time=time(9), end_time=time(10))
+        before = cache.get_versions(provider.pk, old_day), cache.get_versions(provider.pk, new_day)
+
+        slot.date = new_day
+        with self.captureOnCommitCallbacks(execute=True):
+            slot.save()
+
+        self.assertNotEqual(cache.get_versions(provider.pk, old_day), before[0])
+        self.assertNotEqual(cache.get_versions(provider.pk, new_day), before[1])
+
+
+class EarliestAvailableTests(TestCase):
+    @override_settings(TIME_ZONE='Asia/Kolkata')
+    def test_past_slots_are_judged_in_the_configured_time_zone(self):
+        provider_service = make_provider_service()
+        provider = provider_service.provider
+        # 20:00 UTC on Jan 1 is 01:30 on Jan 2 in Kolkata.
+        now = datetime(2030, 1, 1, 20, 0, tzinfo=dt_timezone.utc)
+        past = ProviderTimeSlot.objects.create(provider=provider, date=date(2030, 1, 1), start_time=time(21), end_time=time(22))
+        future = ProviderTimeSlot.objects.create(provider=provider, date=date(2030, 1, 2), start_time=time(9), end_time=time(10))
+
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            ids = [slot['id'] for slot in earliest_available(provider_service.sub_category_id)]
+
+        self.assertEqual(ids, [future.pk])
+        self.assertNotIn(past.pk, ids)
+
+    def test_each_slot_is_listed_once_with_the_cheapest_service(self):
+        provider_service = make_provider_service()
+        provider = provider_service.provider
+        cheaper = ProviderService.objects.create(
+            provider=provider, service=provider_service.service, sub_category=provider_service.sub_category,
+            name='Express facial', description='', duration_minutes=30, price=Decimal('20.00'), image='',
+        )
+        goa = ServiceLocation.objects.create(name='Goa')
+        provider_service.locations.add(goa)
+        day = date.today() + timedelta(days=1)
+        slots = [
+            ProviderTimeSlot.objects.create(provider=provider, date=day, start_time=time(hour), end_time=time(hour + 1))
+            for hour in (9, 10, 11)
+        ]
+
+        with self.assertNumQueries(1):
+            rows = list(earliest_available(provider_service.sub_category_id, limit=2))
+        self.assertEqual([row['id'] for row in rows], [slots[0].pk, slots[1].pk])
+        self.assertEqual({row['service_id'] for row in rows}, {cheaper.pk})
+        self.assertEqual(rows[0]['service_price'], Decimal('20.00'))
+
+        rows = earliest_available(provider_service.sub_category_id, location_id=goa.pk)
+        self.assertEqual([(row['id'], row['service_id']) for row in rows], [(slot.pk, provider_service.pk) for slot in slots])
+
+        response = self.client.get(reverse('get_first_available'), {'subcategory_id': provider_service.sub_category_id})
+        self.assertEqual([row['time_slot_id'] for row in response.json()], [slot.pk for slot in slots])
+        self.assertEqual(response.json()[0]['provider_service_id'], cheaper.pk)
+        self.assertEqual(response.json()[0]['price'], '20.00')
+
+
+class ImporterCountTests(TestCase):
+    def test_existing_and_repeated_rows_are_skipped(self):
+        provider = make_provider()
+        day = date.today() + timedelta(days=1)
+        ProviderTimeSlot.objects.create(provider=provider, date=day, start_time=time(9), end_time=time(10))
+        importer = Importer()
+        records = [
+            {'type': 'working_hours', 'provider': 'provider', 'day_of_week': 0, 'start_time': '08:00', 'end_time': '10:00'},
+            {'type': 'slot', 'provider': 'provider', 'date': day.isoformat(), 'start_time': '09:00', 'end_time': '10:00'},
+            {'type': 'slot', 'provider': 'provider', 'date': day.isoformat(), 'start_time': '10:00', 'end_time': '11:00'},
+            {'type': 'slot', 'provider': 'provider', 'date': day.isoformat(), 'start_time': '10:00', 'end_time': '11:00'},
+        ]
+        for line, record in enumerate(records, start=1):
+            importer.add(line, record)
+        importer.finish()
+        self.assertEqual(importer.written['working_hours'], 0)
+        self.assertEqual(importer.skipped['working_hours'], 1)
+        self.assertEqual(importer.written['slot'], 1)
+        self.assertEqual(importer.skipped['slot'], 2)
+        self.assertEqual(ProviderTimeSlot.objects.filter(provider=provider).count(), 2)
+
+
+class OccupancyMapTests(TestCase):
+    def setUp(self):
+        self.provider_service = make_provider_service()
+        self.provider = self.provider_service.provider
+        self.day = date.today() + timedelta(days=1)
+
+    def test_interval_masks(self):
+        self.assertEqual(interval_mask(2, 5), 0b11100)
+        self.assertEqual(interval_mask(5, 5), 0)
+        self.assertEqual(list(mask_to_intervals(interval_mask(0, 60) | interval_mask(90, 1440))), [(0, 60), (90, 1440)])
+        self.assertEqual(list(mask_to_intervals(0)), [])
+
+    def test_adjacent_intervals_do_not_overlap(self):
+        occupancy = OccupancyMap(self.provider, self.day)
+        occupancy.occupy(self.day, time(9), time(10))
+        self.assertFalse(occupancy.overlaps(self.day, time(10), time(11)))
+        self.assertFalse(occupancy.overlaps(self.day, time(8), time(9)))
+        self.assertTrue(occupancy.overlaps(self.day, time(9, 59), time(11)))
+        self.assertFalse(occupancy.overlaps(self.day + timedelta(days=1), time(9), time(10)))
+
+    def test_midnight_end_closes_the_day(self):
+        occupancy = OccupancyMap(self.provider, self.day)
+        occupancy.occupy(self.day, time(23), time(0))
+        self.assertEqual(occupancy.busy_intervals(self.day), [(23 * 60, 24 * 60)])
+        self.assertTrue(occupancy.overlaps(self.day, time(23, 30), time(0)))
+        self.assertFalse(occupancy.overlaps(self.day, time(22), time(23)))
+
+    def test_find_conflicts_checks_earlier_candidates(self):
+        occupancy = OccupancyMap(self.provider, self.day)
+        occupancy.occupy(self.day, time(9), time(10))
+        candidates = [(self.day, time(9, 30), time(10, 30)), (self.day, time(10), time(11)), (self.day, time(10, 30), time(11, 30))]
+        self.assertEqual(occupancy.find_conflicts(candidates), [candidates[0], candidates[2]])
+
+    def test_loads_appointments_and_blocked_slots(self):
+        slot = ProviderTimeSlot.objects.create(provider=self.provider, date=self.day, start_time=time(9), end_time=time(10))
+        make_appointment(self.provider_service, slot)
+        cancelled = ProviderTimeSlot.objects.create(provider=self.provider, date=self.day, start_time=time(14), end_time=time(15))
+        make_appointment(self.provider_service, cancelled, status='rejected')
+        BlockedSlot.objects.create(provider=self.provider, date=self.day, start_time=time(11), end_time=time(12))
+        # A block without a provider closes the day for everyone.
+        BlockedSlot.objects.create(provider=None, date=self.day, start_time=time(12), end_time=time(13))
+        BlockedSlot.objects.create(provider=make_provider_service('other').provider, date=self.day, start_time=time(16), end_time=time(17))
+
+        occupancy = OccupancyMap(self.provider, self.day)
+        self.assertEqual(occupancy.busy_intervals(self.day), [(9 * 60, 10 * 60), (11 * 60, 13 * 60)])
+        self.assertEqual(OccupancyMap(self.provider, self.day, blocked_slots=False).busy_intervals(self.day), [(9 * 60, 10 * 60)])
+        self.assertEqual(
+            OccupancyMap(self.provider, self.day, appointments=False, time_slots=True, exclude_time_slot=slot).busy_intervals(self.day),
+            [(11 * 60, 13 * 60), (14 * 60, 15 * 60)],
+        )
+
+    def test_edit_time_slot_ignores_the_slot_being_edited(self):
+        WorkingHours.objects.create(provider=self.provider, day_of_week=self.day.weekday(), start_time=time(9), end_time=time(17))
+        slot = ProviderTimeSlot.objects.create(provider=self.provider, date=self.day, start_time=time(9), end_time=time(10))
+        make_appointment(self.provider_service, slot)
+        other = ProviderTimeSlot.objects.create(provider=self.provider, date=self.day, start_time=time(11), end_time=time(12))
+        make_appointment(self.provider_service, other)
+        self.client.force_login(self.provider.user)
+        url = reverse('edit_time_slot', args=[slot.pk])
+
+        self.client.post(url, {'date': self.day.isoformat(), 'start_time': '09:30', 'end_time': '10:30'})
+        slot.refresh_from_db()
+        self.assertEqual((slot.start_time, slot.end_time), (time(9, 30), time(10, 30)))
+
+        self.client.post(url, {'date': self.day.isoformat(), 'start_time': '10:30', 'end_time': '11:30'})
+        slot.refresh_from_db()
+        self.assertEqual((slot.start_time, slot.end_time), (time(9, 30), time(10, 30)))
+
+
+def at(*args):
+    """Freezes timezone.now() at a UTC datetime."""
+    return mock.patch('django.utils.timezone.now', return_value=datetime(*args, tzinfo=dt_timezone.utc))
+
+
+@override_settings(TIME_ZONE='UTC')
+class AvailabilityEngineTests(TestCase):
+    def setUp(self):
+        self.provider_service = make_provider_service()
+        self.provider = self.provider_service.provider
+        # 2030-01-07 is a Monday.
+        self.day = date(2030, 1, 7)
+        self.hours = WorkingHours.objects.create(provider=self.provider, day_of_week=0, start_time=time(9), end_time=time(13))
+
+    def test_split_windows(self):
+        self.assertEqual(split_windows([(0, 100)], 30), [(0, 30), (30, 60), (60, 90)])
+        self.assertEqual(split_windows([(0, 100)], 30, gap_minutes=10), [(0, 30), (40, 70)])
+        self.assertEqual(split_windows([(0, 100)], 0), [])
+
+    def test_free_windows_skip_appointments_and_blocks(self):
+        slot = ProviderTimeSlot.objects.create(provider=self.provider, date=self.day, start_time=time(10), end_time=time(11))
+        make_appointment(self.provider_service, slot)
+        BlockedSlot.objects.create(provider=None, date=self.day, start_time=time(12, 30), end_time=time(14))
+        schedule = ProviderSchedule(self.provider, self.day)
+        self.assertEqual(schedule.free_windows(self.day), [(9 * 60, 10 * 60), (11 * 60, 12 * 60 + 30)])
+        self.assertEqual(schedule.free_windows(self.day + timedelta(days=1)), [])
+        with at(2030, 1, 6, 12):
+            windows = get_available_windows(self.provider_service, self.day)
+        self.assertEqual(windows, [(time(9), time(10)), (time(11), time(12))])
+
+    def test_past_days_and_started_slots_are_not_offered(self):
+        url = reverse('get_availability')
+        with at(2030, 1, 7, 10, 15):
+            self.assertEqual(get_available_windows(self.provider_service, self.day), [(time(11), time(12)), (time(12), time(13))])
+            self.assertEqual(get_available_windows(self.provider_service, self.day - timedelta(days=7)), [])
+            past = self.client.get(url, {'provider_service_id': self.provider_service.pk, 'date': '2029-12-31'})
+            self.assertEqual(past.json(), [])
+        # A window cached earlier in the day is dropped once it has started.
+        params = {'provider_service_id': self.provider_service.pk, 'date': self.day.isoformat()}
+        with at(2030, 1, 7, 8):
+            self.assertEqual(len(self.client.get(url, params).json()), 4)
+        with at(2030, 1, 7, 11):
+            self.assertEqual([window['start_time'] for window in self.client.get(url, params).json()], ['12:00'])
+
+    def test_working_hours_changes_invalidate_cached_windows(self):
+        url = reverse('get_availability')
+        params = {'provider_service_id': self.provider_service.pk, 'date': self.day.isoformat()}
+        with at(2030, 1, 6, 12):
+            self.assertEqual(len(self.client.get(url, params).json()), 4)
+            self.hours.end_time = time(11)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.hours.save()
+            self.assertEqual(len(self.client.get(url, params).json()), 2)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.hours.delete()
+            self.assertEqual(self.client.get(url, params).json(), [])
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.facial = make_provider_service('anna')
+            self.massage = make_provider_service('bob')
+            self.massage.name = 'Deep tissue massage'
+            self.massage.description = 'Relaxing, with a facial oil finish'
+            self.massage.save()
+
+    def test_terms_match_as_prefixes_and_all_must_match(self):
+        self.assertEqual(search.matching_ids('anna fac'), [self.facial.pk])
+        self.assertEqual(search.matching_ids('MASS'), [self.massage.pk])
+        self.assertEqual(search.matching_ids('massage anna'), [])
+        self.assertEqual(search.matching_ids('  !! '), [])
+
+    def test_name_matches_rank_first_and_pages_are_sliced(self):
+        self.assertEqual(search.matching_ids('facial'), [self.facial.pk, self.massage.pk])
+        self.assertEqual(search.matching_ids('facial', limit=1, offset=1), [self.massage.pk])
+        queryset = search.filter_matching(ProviderService.objects.all(), 'tissue')
+        self.assertEqual(list(queryset.values_list('pk', flat=True)), [self.massage.pk])
+
+    def test_rebuild_index_restores_every_document(self):
+        search.remove_services([self.facial.pk, self.massage.pk])
+        self.assertEqual(search.matching_ids('facial'), [])
+        self.assertEqual(search.rebuild_index(), 2)
+        self.assertEqual(search.matching_ids('facial'), [self.facial.pk, self.massage.pk])
+
+    def test_saving_and_deleting_services_updates_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.facial.name = 'Manicure'
+            self.facial.save()
+        self.assertEqual(search.matching_ids('manicure'), [self.facial.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.massage.delete()
+        self.assertEqual(search.matching_ids('tissue'), [])
+
+    def test_subcategory_and_username_changes_reindex(self):
+        subcategory = self.facial.sub_category
+        with self.captureOnCommitCallbacks(execute=True):
+            subcategory.name = 'Skincare'
+            subcategory.save()
+        self.assertEqual(set(search.matching_ids('skincare')), {self.facial.pk, self.massage.pk})
+
+        user = self.facial.provider.user
+        with self.captureOnCommitCallbacks(execute=True):
+            user.username = 'annabelle'
+            user.save()
+        self.assertEqual(search.matching_ids('annabelle'), [self.facial.pk])
+        # Logins only touch last_login and leave the index alone.
+        with mock.patch('providers.search.index_services') as index_services:
+            with self.captureOnCommitCallbacks(execute=True):
+                user.save(update_fields=['last_login'])
+        index_services.assert_not_called()
+
+
+class ConditionalResponseTests(TestCase):
+    def setUp(self):
+        self.provider_service = make_provider_service()
+        self.provider = self.provider_service.provider
+        self.day = date.today() + timedelta(days=1)
+        self.slot = ProviderTimeSlot.objects.create(provider=self.provider, date=self.day, start_time=time(9), end_time=time(10))
+        self.url = reverse('get_available_time_slots')
+        self.params = {'provider_service_id': self.provider_service.pk, 'date': self.day.isoformat()}
+        # ETags also roll over with the clock; keep them in one period.
+        clock = mock.patch('providers.cache.time.time', return_value=1_900_000_000.0)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def etag(self):
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_etag_gets_304(self):
+        etag = self.etag()
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_writes_change_the_etag(self):
+        writes = {
+            'slot': lambda: ProviderTimeSlot.objects.create(provider=self.provider, date=self.day, start_time=time(11), end_time=time(12)),
+            'block': lambda: BlockedSlot.objects.create(provider=self.provider, date=self.day, start_time=time(13), end_time=time(14)),
+            'general block': lambda: BlockedSlot.objects.create(provider=None, date=self.day, start_time=time(15), end_time=time(16)),
+            'appointment': lambda: make_appointment(self.provider_service, self.slot),
+        }
+        for name, write in writes.items():
+            with self.subTest(write=name):
+                etag = self.etag()
+                with self.captureOnCommitCallbacks(execute=True):
+                    write()
+                self.assertNotEqual(self.etag(), etag)
+                response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_other_days_keep_their_etag(self):
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProviderTimeSlot.objects.create(provider=self.provider, date=self.day + timedelta(days=1), start_time=time(9), end_time=time(10))
+        self.assertEqual(self.etag(), etag)
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.online = ServiceLocation.objects.get_or_create(name='Online')[0]
+        cls.mumbai = ServiceLocation.objects.create(name='Mumbai')
+        cls.goa = ServiceLocation.objects.create(name='Goa')
+        # (price, duration, locations) per service; make_provider_service adds Online.
+        specs = [
+            ('20', 30, [cls.mumbai]), ('30', 60, [cls.mumbai, cls.goa]), ('30', 90, []),
+            ('75', 60, [cls.goa]), ('120', 150, [cls.mumbai]), ('50', 20, [cls.mumbai, cls.goa]),
+        ]
+        subcategory = None
+        for n, (price, duration, locations) in enumerate(specs):
+            provider_service = make_provider_service(f'provider{n}', subcategory)
+            subcategory = provider_service.sub_category
+            ProviderService.objects.filter(pk=provider_service.pk).update(price=Decimal(price), duration_minutes=duration)
+            provider_service.locations.add(*locations)
+        cls.subcategory = subcategory
+        cls.services = ProviderService.objects.filter(sub_category=subcategory)
+
+    def expected_counts(self, filters):
+        """Facet counts worked out row by row in Python."""
+        def matching(skip):
+            return list(facets.apply_filters(self.services, filters, skip=skip).prefetch_related('locations'))
+
+        locations = {}
+        for service in matching('locations'):
+            for location in service.locations.all():
+                locations[location.pk] = locations.get(location.pk, 0) + 1
+
+        def in_bucket(value, bucket):
+            low, high = bucket
+            return (low is None or value >= low) and (high is None or value < high)
+
+        return {
+            'locations': locations,
+            'price': [sum(in_bucket(s.price, b) for s in matching('price')) for b in facets.PRICE_BUCKETS],
+            'duration': [sum(in_bucket(s.duration_minutes, b) for s in matching('duration')) for b in facets.DURATION_BUCKETS],
+        }
+
+    def test_counts_match_the_filtered_queryset(self):
+        selections = [
+            {},
+            {'location': [str(self.mumbai.pk)]},
+            {'location': [str(self.mumbai.pk), str(self.goa.pk)]},
+            {'price': ['1']},
+            {'price': ['1'], 'duration': ['2'], 'location': [str(self.goa.pk)]},
+            {'price': ['9'], 'duration': ['x'], 'location': ['y']},
+        ]
+        for selection in selections:
+            with self.subTest(selection=selection):
+                params = QueryDict(mutable=True)
+                for name, values in selection.items():
+                    params.setlist(name, values)
+                filters = facets.parse_filters(params)
+                self.assertEqual(facets.facet_counts(self.services, filters), self.expected_counts(filters))
+
+    def test_location_filter_does_not_duplicate_services(self):
+        filters = facets.parse_filters(QueryDict(f'location={self.mumbai.pk}&location={self.goa.pk}'))
+        ids = list(facets.apply_filters(self.services, filters).values_list('pk', flat=True))
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(len(ids), 5)
+
+    def test_listing_is_paginated(self):
+        self.client.force_login(make_client())
+        url = reverse('select_provider_service', args=[self.subcategory.pk])
+        seen = []
+        with mock.patch('appointments.views.SERVICES_PAGE_SIZE', 4):
+            for page in (1, 2):
+                response = self.client.get(url, {'page': page})
+                seen += [service.pk for service in response.context['provider_services']]
+                self.assertEqual(response.context['has_next'], page == 1)
+            filtered = self.client.get(url, {'price': '1', 'page': 1})
+        self.assertEqual(seen, sorted(self.services.values_list('pk', flat=True)))
+        self.assertEqual(len(filtered.context['provider_services']), 2)
+        self.assertFalse(filtered.context['has_next'])
+
+
+class AvailabilityCalendarTests(TestCase):
+    def setUp(self):
+        self.provider_service = make_provider_service()
+        self.provider = self.provider_service.provider
+        self.month = (date.today().replace(day=1) + timedelta(days=62)).replace(day=1)
+        self.url = reverse('get_availability_calendar')
+
+    def slot(self, day, hour, **fields):
+        return ProviderTimeSlot.objects.create(
+            provider=self.provider, date=self.month.replace(day=day), start_time=time(hour), end_time=time(hour + 1), **fields,
+        )
+
+    def test_counts_and_first_start_per_day(self):
+        self.slot(1, 14)
+        self.slot(1, 9)
+        self.slot(5, 9, is_booked=True)
+        make_appointment(self.provider_service, self.slot(5, 11))
+        self.slot(28, 16)
+        response = self.client.get(self.url, {
+            'provider_service_id': self.provider_service.pk, 'month': self.month.strftime('%Y-%m'),
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['month'], self.month.strftime('%Y-%m'))
+        next_month = (self.month + timedelta(days=31)).replace(day=1)
+        self.assertEqual(len(data['counts']), (next_month - self.month).days)
+        self.assertEqual(data['counts'][0], 2)
+        self.assertEqual(data['first_start'][0], '09:00')
+        self.assertEqual((data['counts'][4], data['first_start'][4]), (0, None))
+        self.assertEqual((data['counts'][27], data['first_start'][27]), (1, '16:00'))
+        self.assertEqual(sum(data['counts']), 3)
+
+    def test_past_months_have_no_open_days(self):
+        ProviderTimeSlot.objects.create(provider=self.provider, date=date(2020, 1, 15), start_time=time(9), end_time=time(10))
+        data = self.client.get(self.url, {'provider_service_id': self.provider_service.pk, 'month': '2020-01'}).json()
+        self.assertEqual(data['counts'], [0] * 31)
+
+    def test_malformed_parameters_get_400(self):
+        for params in (
+            {'provider_service_id': self.provider_service.pk, 'month': '2030-13'},
+            {'provider_service_id': self.provider_service.pk, 'month': 'March'},
+            {'provider_service_id': self.provider_service.pk, 'month': '2030-01-05'},
+            {'provider_service_id': 'x', 'month': '2030-01'},
+            {'month': '2030-01'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
@@ -0,0 +1,335 @@
+# providers/transfer.py
+import csv
+import json
+from collections import Counter
+from datetime import date, time as dt_time
+from decimal import Decimal, InvalidOperation
+from django.contrib.auth.models import User
+from django.db import transaction
+from accounts.models import UserRole
+from services.models import ServiceCategory, ServiceSubCategory, Service
+from .models import ServiceProvider, ProviderService, ServiceLocation, WorkingHours, ProviderTimeSlot
+from . import cache, search
+
+# Record types in dependency order; every record names its provider by username.
+RECORD_TYPES = ('provider', 'service', 'working_hours', 'slot')
+
+FIELDS = {
+    'provider': ['username', 'email', 'phone_number', 'bio', 'location'],
+    'service': ['provider', 'category', 'subcategory', 'service', 'name', 'description',
+                'duration_minutes', 'price', 'image', 'locations'],
+    'working_hours': ['provider', 'day_of_week', 'start_time', 'end_time'],
+    'slot': ['provider', 'date', 'start_time', 'end_time', 'is_booked'],
+}
+
+# CSV cells cannot hold lists, so service locations are joined with this.
+LOCATION_SEPARATOR = '|'
+
+# Fields that must be present and non-empty.
+REQUIRED = {
+    'provider': ['username'],
+    'service': ['provider', 'category', 'subcategory', 'name', 'duration_minutes', 'price'],
+    'working_hours': ['provider', 'day_of_week', 'start_time', 'end_time'],
+    'slot': ['provider', 'date', 'start_time', 'end_time'],
+}
+
+
+class RecordError(ValueError):
+    """A record that cannot be imported; the message carries its input line."""
+
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+
+
+def read_jsonl(stream):
+    for line, text in enumerate(stream, start=1):
+        if text.strip():
+            try:
+                yield line, json.loads(text)
+            except json.JSONDecodeError as e:
+                raise RecordError(line, f"invalid JSON ({e.msg})")
+
+
+def read_csv(stream, record_type):
+    # Line 1 is the header row.
+    for line, row in enumerate(csv.DictReader(stream), start=2):
+        row['type'] = record_type
+        yield line, row
+
+
+def _time(value):
+    return dt_time.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+class Importer:
+    """
+    Streams records into the database in batches. Foreign keys are resolved
+    through in-memory maps keyed by natural keys (username, names), so a
+    batch costs one bulk INSERT per table instead of a lookup per row. Each
+    flush runs in its own transaction; a failed batch rolls back alone.
+
+    Existing providers and services are skipped. Working hours and slots that
+    already exist (by their unique constraint) are skipped too and leave the
+    existing row unchanged.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.buffers = {record_type: [] for record_type in RECORD_TYPES}
+        self.written = Counter()
+        self.skipped = Counter()
+        self.touched_days = set()
+        self.touched_schedules = set()
+        self.providers = dict(ServiceProvider.objects.values_list('user__username', 'id'))
+        self.categories = dict(ServiceCategory.objects.values_list('name', 'id'))
+        self.subcategories = dict(ServiceSubCategory.objects.values_list('name', 'id'))
+        self.services = {(name, sub_id): pk for pk, name, sub_id in Service.objects.values_list('id', 'name', 'sub_category_id')}
+        self.locations = dict(ServiceLocation.objects.values_list('name', 'id'))
+        # Loaded on the first service batch; provider services have no natural key in the schema.
+        self.existing_services = None
+
+    def add(self, line, record):
+        record_type = record.get('type')
+        if record_type not in self.buffers:
+            raise RecordError(line, f"unknown record type {record_type!r}")
+        missing = [name for name in REQUIRED[record_type] if record.get(name) in (None, '')]
+        if missing:
+            raise RecordError(line, f"missing {', '.join(missing)}")
+        self.buffers[record_type].append((line, record))
+        if len(self.buffers[record_type]) >= self.batch_size:
+            self.flush(record_type)
+
+    def finish(self):
+        for record_type in RECORD_TYPES:
+            self.flush(record_type)
+        # bulk_create skips signals, so cached availability is dropped by hand.
+        for provider_id, day in self.touched_days:
+            cache.invalidate(provider_id, day)
+        for provider_id in self.touched_schedules:
+            cache.invalidate_schedule(provider_id)
+
+    def flush(self, record_type):
+        # Providers referenced by a dependent batch may still be buffered.
+        if record_type != 'provider':
+            self.flush('provider')
+        batch, self.buffers[record_type] = self.buffers[record_type], []
+        if batch:
+            with transaction.atomic():
+                getattr(self, f'_import_{record_type}')(batch)
+
+    def _convert(self, batch, convert):
+        # Ties bad values (dates, numbers) in a batch back to their input line.
+        for line, record in batch:
+            try:
+                yield convert(line, record)
+            except (ValueError, TypeError, InvalidOperation) as e:
+                if isinstance(e, RecordError):
+                    raise
+                raise RecordError(line, str(e) or e.__class__.__name__) from e
+
+    def _provider_id(self, line, record):
+        try:
+            return self.providers[record['provider']]
+        except KeyError:
+            raise RecordError(line, f"unknown provider {record.get('provider')!r}")
+
+    def _import_provider(self, batch):
+        new = {}
+        for line, record in batch:
+            username = record['username']
+            if username in self.providers or username in new:
+                self.skipped['provider'] += 1
+                continue
+            user = User(username=username, email=record.get('email') or '')
+            user.set_unusable_password()
+            new[username] = (user, record)
+        taken = set(User.objects.filter(username__in=list(new)).values_list('username', flat=True))
+        for username in taken:
+            # Existing accounts are never converted into providers by an import.
+            del new[username]
+        self.skipped['provider'] += len(taken)
+        if not new:
+            return
+        users = User.objects.bulk_create([user for user, _ in new.values()])
+        UserRole.objects.bulk_create([UserRole(user=user, role='service_provider') for user in users])
+        providers = ServiceProvider.objects.bulk_create([
+            ServiceProvider(
+                user=user,
+                phone_number=record.get('phone_number') or None,
+                bio=record.get('bio') or None,
+                location=record.get('location') or None,
+            )
+            for user, record in new.values()
+        ])
+        for provider, username in zip(providers, new):
+            self.providers[username] = provider.pk
+        self.written['provider'] += len(providers)
+
+    def _named(self, lookup, model, name, **fields):
+        # Catalog rows are few and rarely new, so they are created one at a
+        # time through the ORM and their signals keep the catalog cache fresh.
+        if name not in lookup:
+            lookup[name] = model.objects.get_or_create(name=name, defaults=fields)[0].pk
+        return lookup[name]
+
+    def _service_row(self, line, record):
+        provider_id = self._provider_id(line, record)
+        category_id = self._named(self.categories, ServiceCategory, record['category'])
+        subcategory_id = self._named(self.subcategories, ServiceSubCategory, record['subcategory'], category_id=category_id)
+        service_key = (record.get('service') or record['name'], subcategory_id)
+        if service_key not in self.services:
+            self.services[service_key] = Service.objects.get_or_create(name=service_key[0], sub_category_id=subcategory_id)[0].pk
+        locations = record.get('locations') or []
+        if isinstance(locations, str):
+            locations = [name for name in locations.split(LOCATION_SEPARATOR) if name]
+        return ProviderService(
+            provider_id=provider_id,
+            sub_category_id=subcategory_id,
+            service_id=self.services[service_key],
+            name=record['name'],
+            description=record.get('description') or '',
+            duration_minutes=int(record['duration_minutes']),
+            price=Decimal(str(record['price'])),
+            image=record.get('image') or '',
+        ), [self._named(self.locations, ServiceLocation, name) for name in locations]
+
+    def _import_service(self, batch):
+        if self.existing_services is None:
+            self.existing_services = set(ProviderService.objects.values_list('provider_id', 'name'))
+        rows = []
+        for service, location_ids in self._convert(batch, self._service_row):
+            # A provider's services are keyed by name, so re-running an import adds nothing.
+            key = (service.provider_id, service.name)
+            if key in self.existing_services:
+                self.skipped['service'] += 1
+                continue
+            self.existing_services.add(key)
+            rows.append((service, location_ids))
+        if not rows:
+            return
+        services = ProviderService.objects.bulk_create([service for service, _ in rows])
+        Link = ProviderService.locations.through
+        Link.objects.bulk_create([
+            Link(providerservice_id=service.pk, servicelocation_id=location_id)
+            for service, (_, location_ids) in zip(services, rows) for location_id in location_ids
+        ])
+        search.index_services([service.pk for service in services])
+        self.written['service'] += len(services)
+
+    def _working_hours_row(self, line, record):
+        return WorkingHours(
+            provider_id=self._provider_id(line, record),
+            day_of_week=int(record['day_of_week']),
+            start_time=_time(record['start_time']),
+            end_time=_time(record['end_time']),
+        )
+
+    def _new_rows(self, record_type, rows, existing, key):
+        # Only rows not yet in the table (or earlier in the batch) count as
+        # written; ignore_conflicts still covers a concurrent insert.
+        new = []
+        for row in rows:
+            if key(row) in existing:
+                continue
+            existing.add(key(row))
+            new.append(row)
+        self.skipped[record_type] += len(rows) - len(new)
+        return new
+
+    def _import_working_hours(self, batch):
+        rows = list(self._convert(batch, self._working_hours_row))
+        # Existing hours for a provider and day are kept.
+        existing = set(WorkingHours.objects.filter(
+            provider_id__in={row.provider_id for row in rows},
+        ).values_list('provider_id', 'day_of_week'))
+        rows = self._new_rows('working_hours', rows, existing, lambda row: (row.provider_id, row.day_of_week))
+        WorkingHours.objects.bulk_create(rows, ignore_conflicts=True)
+        self.touched_schedules.update(row.provider_id for row in rows)
+        self.written['working_hours'] += len(rows)
+
+    def _slot_row(self, line, record):
+        day = record['date']
+        return ProviderTimeSlot(
+            provider_id=self._provider_id(line, record),
+            date=date.fromisoformat(day) if isinstance(day, str) else day,
+            start_time=_time(record['start_time']),
+            end_time=_time(record['end_time']),
+            is_booked=_bool(record.get('is_booked', False)),
+        )
+
+    def _import_slot(self, batch):
+        rows = list(self._convert(batch, self._slot_row))
+        self.touched_days.update((slot.provider_id, slot.date) for slot in rows)
+        # unique_provider_time_slot makes re-importing the same file a no-op.
+        existing = set(ProviderTimeSlot.objects.filter(
+            provider_id__in={row.provider_id for row in rows},
+            date__in={row.date for row in rows},
+        ).values_list('provider_id', 'date', 'start_time', 'end_time'))
+        rows = self._new_rows(
+            'slot', rows, existing, lambda row: (row.provider_id, row.date, row.start_time, row.end_time),
+        )
+        ProviderTimeSlot.objects.bulk_create(rows, ignore_conflicts=True)
+        self.written['slot'] += len(rows)
+
+
+def export_records(record_type, chunk_size=2000):
+    """Yields plain dicts for one record type, streaming rows with .iterator()."""
+    if record_type == 'provider':
+        rows = ServiceProvider.objects.values_list('user__username', 'user__email', 'phone_number', 'bio', 'location')
+        for username, email, phone_number, bio, location in rows.order_by('pk').iterator(chunk_size=chunk_size):
+            yield {'username': username, 'email': email, 'phone_number': phone_number, 'bio': bio, 'location': location}
+    elif record_type == 'service':
+        # The location names are prefetched per chunk by iterator().
+        services = ProviderService.objects.select_related(
+            'provider__user', 'sub_category__category', 'service',
+        ).prefetch_related('locations').order_by('pk')
+        for ps in services.iterator(chunk_size=chunk_size):
+            yield {
+                'provider': ps.provider.user.username,
+                'category': ps.sub_category.category.name,
+                'subcategory': ps.sub_category.name,
+                'service': ps.service.name,
+                'name': ps.name,
+                'description': ps.description,
+                'duration_minutes': ps.duration_minutes,
+                'price': str(ps.price),
+                'image': ps.image.name,
+                'locations': [location.name for location in ps.locations.all()],
+            }
+    elif record_type == 'working_hours':
+        rows = WorkingHours.objects.values_list('provider__user__username', 'day_of_week', 'start_time', 'end_time')
+        for provider, day_of_week, start_time, end_time in rows.order_by('pk').iterator(chunk_size=chunk_size):
+            yield {'provider': provider, 'day_of_week': day_of_week,
+                   'start_time': start_time.isoformat(), 'end_time': end_time.isoformat()}
+    elif record_type == 'slot':
+        rows = ProviderTimeSlot.objects.values_list('provider__user__username', 'date', 'start_time', 'end_time', 'is_booked')
+        for provider, day, start_time, end_time, is_booked in rows.order_by('pk').iterator(chunk_size=chunk_size):
+            yield {'provider': provider, 'date': day.isoformat(), 'start_time': start_time.isoformat(),
+                   'end_time': end_time.isoformat(), 'is_booked': is_booked}
+
+
+def write_jsonl(stream, record_type, records):
+    count = 0
+    for record in records:
+        stream.write(json.dumps({'type': record_type, **record}) + '\n')
+        count += 1
+    return count
+
+
+def write_csv(stream, record_type, records):
+    writer = csv.DictWriter(stream, fieldnames=FIELDS[record_type])
+    writer.writeheader()
+    count = 0
+    for record in records:
+        if record_type == 'service':
+            record = {**record, 'locations': LOCATION_SEPARATOR.join(record['locations'])}
+        writer.writerow(record)
+        count += 1
+    return count
+
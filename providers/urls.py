@@ -8,13 +8,19 @@ urlpatterns = [
     path('manage-working-hours/', views.manage_working_hours, name='manage_working_hours'),
     path('manage-blocked-slots/', views.manage_blocked_slots, name='manage_blocked_slots'),
     path('add-time-slot/', views.add_time_slot, name='add_time_slot'),
+    path('generate-time-slots/', views.bulk_generate_time_slots, name='bulk_generate_time_slots'),
     path('edit-time-slot/<int:pk>/', views.edit_time_slot, name='edit_time_slot'), # NEW URL
     path('delete-time-slot/<int:pk>/', views.delete_time_slot, name='delete_time_slot'), # NEW URL
     path('manage-appointments/', views.manage_appointments, name='manage_appointments'),
+    path('api/appointments/', views.provider_appointments_api, name='provider_appointments_api'),
     path('manage-blocked-slots/delete/<int:pk>/', views.delete_blocked_slot, name='delete_blocked_slot'),
     # This URL now accepts an integer argument named 'category_id'
     path('api/subcategories/<int:category_id>/', views.get_subcategories, name='get_subcategories'),
     path('api/time-slots/', views.get_available_time_slots, name='get_available_time_slots'),
+    path('api/availability/', views.get_availability, name='get_availability'),
+    path('api/calendar/', views.get_availability_calendar, name='get_availability_calendar'),
+    path('api/first-available/', views.get_first_available, name='get_first_available'),
+    path('api/cache-stats/', views.availability_cache_stats, name='availability_cache_stats'),
     path('remove-offered-service/<int:pk>/', views.remove_offered_service, name='remove_offered_service'),
     path('edit-provider-service/<int:pk>/', views.edit_provider_service, name='edit_provider_service'),
 ]
\ No newline at end of file
@@ -1,33 +1,43 @@
 # providers/views.py
+import json
 from django.db import IntegrityError
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from .models import ServiceProvider, ProviderService, ProviderTimeSlot, ServiceLocation, WorkingHours, BlockedSlot
-from services.models import ServiceCategory, ServiceSubCategory, Service
+from .models import ServiceProvider, ProviderService, ProviderTimeSlot, WorkingHours, BlockedSlot
+from services.models import Service
 from appointments.models import Appointment
-from .forms import ProviderServiceForm, ProviderTimeSlotForm, WorkingHoursForm, ProviderBlockedSlotForm
+from appointments.booking import transition_appointment, InvalidTransition, ahold_slot, arelease_holds, aopen_checkout_session, SlotUnavailable
+from appointments.payments import record_event
+from appointments.pagination import keyset_page, paginate, page_size_from, serialize_appointment
+from .forms import ProviderServiceForm, ProviderTimeSlotForm, WorkingHoursForm, ProviderBlockedSlotForm, BulkTimeSlotForm
+from .availability import get_available_windows, open_time_slots, earliest_available
+from .conflicts import OccupancyMap
+from .slots import generate_time_slots
+from .stripe_client import get_stripe_client
+from . import cache as availability_cache
 from django.http import JsonResponse
-from django.db.models import F
+from django.db.models import Count, Min
 from datetime import datetime, timedelta, date
 import stripe
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_control
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from services.catalog import aget_catalog
 from django.http import HttpResponse
-from django.db.models import Q
 
 def is_service_provider(user):
     return hasattr(user, 'service_provider_profile')
 
-# Initialize Stripe with the secret key from settings
-stripe.api_key = settings.STRIPE_SECRET_KEY
 
 @login_required
 @user_passes_test(is_service_provider, login_url='/accounts/login/')
 def provider_dashboard(request):
     provider = get_object_or_404(ServiceProvider, user=request.user)
     provider_services = ProviderService.objects.filter(provider=provider)
-    pending_appointments = Appointment.objects.filter(provider_service__provider=provider, status='pending')
+    pending_appointments = Appointment.objects.with_details().filter(provider=provider, status='pending')
     
     context = {
         'provider': provider,
@@ -103,17 +113,9 @@ def manage_blocked_slots(request):
             bs.provider = provider
             
             # Check for conflicts with existing appointments before saving
-            from appointments.models import Appointment
-            from django.db.models import Q
-            
-            conflicts = Appointment.objects.filter(
-                Q(date=bs.date),
-                Q(status__in=['pending', 'approved', 'paid']),
-                Q(provider_service__provider=provider),
-                Q(time_slot__start_time__lt=bs.end_time) & Q(time_slot__end_time__gt=bs.start_time)
-            )
-            
-            if conflicts.exists():
+            occupancy = OccupancyMap(provider, bs.date, blocked_slots=False)
+
+            if occupancy.overlaps(bs.date, bs.start_time, bs.end_time):
                 messages.error(request, 'This blocked slot conflicts with an existing appointment.')
             else:
                 try:
@@ -139,24 +141,10 @@ def add_time_slot(request):
             ts = form.save(commit=False)
             ts.provider = provider
 
-            # Check conflicts with appointments
-            conflicts = Appointment.objects.filter(
-                date=ts.date,
-                status__in=['pending', 'approved', 'paid'],
-                provider_service__provider=provider,
-                time_slot__start_time__lt=ts.end_time,
-                time_slot__end_time__gt=ts.start_time
-            )
+            # Check conflicts with appointments and blocked slots
+            occupancy = OccupancyMap(provider, ts.date)
 
-            # Check conflicts with blocked slots
-            conflicting_blocked_slots = BlockedSlot.objects.filter(
-                provider=provider,
-                date=ts.date,
-                start_time__lt=ts.end_time,
-                end_time__gt=ts.start_time
-            )
-
-            if conflicts.exists() or conflicting_blocked_slots.exists():
+            if occupancy.overlaps(ts.date, ts.start_time, ts.end_time):
                 messages.error(request, 'This time slot conflicts with existing appointments or blocked slots.')
                 return redirect('add_time_slot')
 
@@ -202,24 +190,11 @@ def edit_time_slot(request, pk):
         if form.is_valid():
             updated_ts = form.save(commit=False)
 
-            # Check conflicts with appointments
-            conflicts = Appointment.objects.filter(
-                date=updated_ts.date,
-                status__in=['pending', 'approved', 'paid'],
-                provider_service__provider=provider,
-                time_slot__start_time__lt=updated_ts.end_time,
-                time_slot__end_time__gt=updated_ts.start_time
-            ).exclude(pk=ts.pk)  # exclude current slot
-
-            # Check conflicts with blocked slots
-            conflicting_blocked_slots = BlockedSlot.objects.filter(
-                provider=provider,
-                date=updated_ts.date,
-                start_time__lt=updated_ts.end_time,
-                end_time__gt=updated_ts.start_time
-            ).exclude(pk=ts.pk)  # exclude current slot if needed
-
-            if conflicts.exists() or conflicting_blocked_slots.exists():
+            # Check conflicts with appointments and blocked slots,
+            # ignoring any appointment already attached to this slot
+            occupancy = OccupancyMap(provider, updated_ts.date, exclude_time_slot=ts)
+
+            if occupancy.overlaps(updated_ts.date, updated_ts.start_time, updated_ts.end_time):
                 messages.error(request, 'This time slot conflicts with existing appointments or blocked slots.')
                 return redirect('edit_time_slot', pk=pk)
 
@@ -250,6 +225,33 @@ def edit_time_slot(request, pk):
 
     return render(request, 'providers/edit_time_slot.html', {'form': form, 'ts': ts})
 
+@login_required
+@user_passes_test(is_service_provider, login_url='/accounts/login/')
+def bulk_generate_time_slots(request):
+    provider = get_object_or_404(ServiceProvider, user=request.user)
+
+    if request.method == 'POST':
+        form = BulkTimeSlotForm(request.POST)
+        if form.is_valid():
+            created = generate_time_slots(
+                provider,
+                form.cleaned_data['start_date'],
+                form.cleaned_data['end_date'],
+                form.cleaned_data['slot_minutes'],
+                form.cleaned_data['gap_minutes'],
+            )
+            if created:
+                messages.success(request, f'{created} time slots generated successfully!')
+            else:
+                messages.info(request, 'No free time slots were found in that date range.')
+            return redirect('add_time_slot')
+        else:
+            messages.error(request, 'Please correct the errors in the form.')
+    else:
+        form = BulkTimeSlotForm()
+
+    return render(request, 'providers/bulk_generate_time_slots.html', {'form': form})
+
 @login_required
 @user_passes_test(is_service_provider, login_url='/accounts/login/')
 def delete_time_slot(request, pk):
@@ -267,38 +269,61 @@ def delete_time_slot(request, pk):
 @user_passes_test(is_service_provider, login_url='/accounts/login/')
 def manage_appointments(request):
     provider = get_object_or_404(ServiceProvider, user=request.user)
-    pending_appointments = Appointment.objects.filter(provider_service__provider=provider, status='pending')
-    approved_appointments = Appointment.objects.filter(provider_service__provider=provider, status='approved')
-    
     if request.method == 'POST':
         appt_id = request.POST.get('appointment_id')
         action = request.POST.get('action')
-        appt = get_object_or_404(Appointment, id=appt_id, provider_service__provider=provider)
+        appt = get_object_or_404(Appointment, id=appt_id, provider=provider)
         
-        if action == 'approve':
-            appt.status = 'approved'
-            appt.save()
-            
-            # NEW: Mark the time slot as booked
-            appt.time_slot.is_booked = True
-            appt.time_slot.save()
-            
-            messages.success(request, 'Appointment approved!')
-        elif action == 'reject':
-            appt.status = 'rejected'
-            appt.save()
-            messages.info(request, 'Appointment rejected.')
+        try:
+            if action == 'approve':
+                # The slot was already claimed when the client requested it.
+                transition_appointment(appt, ['pending'], 'approved')
+                messages.success(request, 'Appointment approved!')
+            elif action == 'reject':
+                transition_appointment(appt, ['pending'], 'rejected', release_slot=True)
+                messages.info(request, 'Appointment rejected.')
+        except InvalidTransition:
+            messages.error(request, 'This appointment has already been updated.')
             
         return redirect('manage_appointments')
-    
+
+    appointments = Appointment.objects.with_details().filter(provider=provider)
+    page_size = page_size_from(request.GET)
+    try:
+        pending_appointments, pending_cursor = keyset_page(
+            appointments.filter(status='pending'), request.GET.get('pending_cursor'), page_size
+        )
+        approved_appointments, approved_cursor = keyset_page(
+            appointments.filter(status='approved'), request.GET.get('approved_cursor'), page_size
+        )
+    except ValueError:
+        return redirect('manage_appointments')
+
     context = {
         'provider': provider,
         'pending_appointments': pending_appointments,
         'approved_appointments': approved_appointments,
+        'pending_cursor': pending_cursor,
+        'approved_cursor': approved_cursor,
     }
     return render(request, 'providers/manage_appointments.html', context)
 
 
+@login_required
+@user_passes_test(is_service_provider, login_url='/accounts/login/')
+def provider_appointments_api(request):
+    # JSON variant of manage_appointments for lazy-loading further pages.
+    appointments = Appointment.objects.with_details().filter(provider=request.user.service_provider_profile)
+    try:
+        appointments, next_cursor = paginate(appointments, request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'results': [serialize_appointment(appt) for appt in appointments],
+        'next_cursor': next_cursor,
+    })
+
+
 @login_required
 @user_passes_test(is_service_provider, login_url='/accounts/login/')
 def edit_provider_service(request, pk):
@@ -338,38 +363,166 @@ def remove_offered_service(request, pk):
 # In your views.py
 
 @login_required
-def get_subcategories(request, category_id):  # Accept category_id as an argument
-    if category_id:
-        subcategories = ServiceSubCategory.objects.filter(category_id=category_id).values('id', 'name')
-        return JsonResponse(list(subcategories), safe=False)
-    return JsonResponse([], safe=False)
-
-
-def get_available_time_slots(request):
+@cache_control(private=True, no_cache=True)
+async def get_subcategories(request, category_id):  # Accept category_id as an argument
+    # Async, like the other polled JSON endpoints, so ASGI workers serve it on the event loop.
+    catalog = await aget_catalog()
+    etag = f'"subcategories-{category_id}-{catalog.version}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        subcategories = catalog.subcategories_of(category_id) if category_id else ()
+        response = JsonResponse([{'id': s.pk, 'name': s.name} for s in subcategories], safe=False)
+    response['ETag'] = etag
+    return response
+
+
+async def get_available_time_slots(request):
     provider_service_id = request.GET.get('provider_service_id')
     date_str = request.GET.get('date')
     
     try:
-        ps = get_object_or_404(ProviderService, id=provider_service_id)
+        ps = await aget_object_or_404(ProviderService, id=provider_service_id)
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
     except (ValueError, ProviderService.DoesNotExist):
         return JsonResponse([], safe=False)
-    
-    time_slots = ProviderTimeSlot.objects.filter(
-        provider=ps.provider,
-        date=date,
-        is_booked=False
-    ).values('id', 'start_time', 'end_time')
-    
-    data = [{'id': ts['id'], 'start_time': ts['start_time'].strftime('%H:%M')} for ts in time_slots]
+
+    # Revalidation is answered from the change counters without touching the slot table.
+    versions = await availability_cache.aget_versions(ps.provider_id, date)
+    etag = availability_cache.versioned_etag('slots', ps.provider_id, date, versions)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        async def compute():
+            time_slots = open_time_slots().filter(
+                provider_id=ps.provider_id,
+                date=date,
+            ).order_by('start_time').values('id', 'start_time', 'end_time')
+            return [{'id': ts['id'], 'start_time': ts['start_time'].strftime('%H:%M')} async for ts in time_slots]
+
+        data = await availability_cache.aget_or_compute('slots', ps.provider_id, date, compute, versions)
+        response = JsonResponse(data, safe=False)
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+def get_availability_calendar(request):
+    # Per-day open slot counts and first free start time for a whole month,
+    # so the booking page can render a month view from a single request.
+    provider_service_id = request.GET.get('provider_service_id')
+    month_str = request.GET.get('month')
+
+    try:
+        provider_service_id = int(provider_service_id)
+        first_day = datetime.strptime(month_str, '%Y-%m').date() if month_str else date.today().replace(day=1)
+    except (ValueError, TypeError):
+        return JsonResponse({'error': 'Invalid provider_service_id or month.'}, status=400)
+
+    next_month = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    days_in_month = (next_month - first_day).days
+
+    rows = open_time_slots().filter(
+        provider__service_offerings__id=provider_service_id,
+        date__gte=max(first_day, date.today()),
+        date__lt=next_month,
+    ).values('date').annotate(free=Count('id'), first_start=Min('start_time')).order_by()
+
+    counts = [0] * days_in_month
+    first_start = [None] * days_in_month
+    for row in rows:
+        index = (row['date'] - first_day).days
+        counts[index] = row['free']
+        first_start[index] = row['first_start'].strftime('%H:%M')
+
+    return JsonResponse({
+        'month': first_day.strftime('%Y-%m'),
+        'counts': counts,
+        'first_start': first_start,
+    })
+
+def get_availability(request):
+    # Free windows computed from working hours, blocked slots and appointments,
+    # without requiring a ProviderTimeSlot row for every bookable minute.
+    provider_service_id = request.GET.get('provider_service_id')
+    date_str = request.GET.get('date')
+
+    try:
+        ps = ProviderService.objects.select_related('provider').get(id=provider_service_id)
+        day = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except (ValueError, TypeError, ProviderService.DoesNotExist):
+        return JsonResponse([], safe=False)
+
+    def compute():
+        return [
+            {'start_time': start.strftime('%H:%M'), 'end_time': end.strftime('%H:%M')}
+            for start, end in get_available_windows(ps, day)
+        ]
+
+    now = timezone.localtime()
+    if day < now.date():
+        return JsonResponse([], safe=False)
+    data = availability_cache.get_or_compute(f'windows-{ps.duration_minutes}', ps.provider_id, day, compute)
+    if day == now.date():
+        # Today's cached windows may predate the clock passing their start.
+        data = [window for window in data if window['start_time'] > now.strftime('%H:%M')]
+    return JsonResponse(data, safe=False)
+
+@login_required
+@user_passes_test(lambda user: user.is_staff, login_url='/accounts/login/')
+def availability_cache_stats(request):
+    return JsonResponse(availability_cache.cache_stats())
+
+def get_first_available(request):
+    # The soonest open slots across all providers of a subcategory, replacing
+    # one time-slot probe per provider.
+    try:
+        subcategory_id = int(request.GET.get('subcategory_id'))
+        location_id = int(request.GET['location_id']) if request.GET.get('location_id') else None
+        start_date = datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if request.GET.get('start') else None
+        end_date = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if request.GET.get('end') else None
+        limit = min(int(request.GET.get('limit', 10)), 50)
+    except (ValueError, TypeError):
+        return JsonResponse({'error': 'Invalid search parameters.'}, status=400)
+
+    rows = earliest_available(subcategory_id, location_id, start_date, end_date, max(limit, 1))
+    data = [
+        {
+            'time_slot_id': row['id'],
+            'date': row['date'].isoformat(),
+            'start_time': row['start_time'].strftime('%H:%M'),
+            'end_time': row['end_time'].strftime('%H:%M'),
+            'provider_service_id': row['service_id'],
+            'provider_service': row['service_name'],
+            # SQLite hands subquery decimals back unquantized (20 rather than 20.00).
+            'price': f"{row['service_price']:.2f}",
+            'provider': row['provider__user__username'],
+        }
+        for row in rows
+    ]
     return JsonResponse(data, safe=False)
 
-def create_checkout_session(request, appt_id):
+@login_required
+async def create_checkout_session(request, appt_id):
+    # Async so a worker waiting on Stripe keeps serving other requests.
     if request.method == 'POST':
-        appointment = get_object_or_404(Appointment, pk=appt_id)
-        
+        user = await request.auser()
+        appointment = await aget_object_or_404(Appointment.objects.with_details(), pk=appt_id)
+        if appointment.client_id != user.pk:
+            return JsonResponse({'error': "This appointment belongs to another client."}, status=403)
+        if appointment.status != 'approved':
+            return JsonResponse({'error': "This appointment is not awaiting payment."}, status=403)
+
+        # Double clicks and reloads reuse the session that is still open.
+        session_id = await aopen_checkout_session(appointment)
+        if session_id:
+            return JsonResponse({'sessionId': session_id})
+
+        # Reserve the slot for the lifetime of the checkout session.
+        try:
+            hold = await ahold_slot(appointment)
+        except SlotUnavailable as e:
+            return JsonResponse({'error': str(e)}, status=409)
+
         try:
-            checkout_session = stripe.checkout.Session.create(
+            checkout_session = await get_stripe_client().v1.checkout.sessions.create_async(params=dict(
                 payment_method_types=['card'],
                 line_items=[
                     {
@@ -384,23 +537,27 @@ def create_checkout_session(request, appt_id):
                     },
                 ],
                 mode='payment',
+                expires_at=int(hold.expires_at.timestamp()),
                 success_url=f"{settings.DOMAIN_NAME}/payment-success/?session_id={{CHECKOUT_SESSION_ID}}",
                 cancel_url=f"{settings.DOMAIN_NAME}/payment-cancel/",
                 metadata={
                     'appointment_id': appointment.pk,
                 }
-            )
+            ))
+            hold.session_id = checkout_session.id
+            await hold.asave(update_fields=['session_id'])
             return JsonResponse({'sessionId': checkout_session.id})
         except Exception as e:
+            await arelease_holds([appointment.pk])
             return JsonResponse({'error': str(e)}, status=400)
     return HttpResponse(status=405)
 
 @login_required
-def payment_success(request):
+async def payment_success(request):
     session_id = request.GET.get('session_id')
     if session_id:
         try:
-            checkout_session = stripe.checkout.Session.retrieve(session_id)
+            checkout_session = await get_stripe_client().v1.checkout.sessions.retrieve_async(session_id)
             messages.success(request, 'Payment successful! Your appointment is confirmed.')
             return redirect('appointment_list')
         except stripe.error.StripeError as e:
@@ -429,26 +586,8 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError as e:
         return HttpResponse(status=400)
 
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        appointment_id = session.get('metadata', {}).get('appointment_id')
-
-        if appointment_id:
-            try:
-                appointment = Appointment.objects.get(pk=appointment_id)
-                if session.get('payment_status') == 'paid':
-                    appointment.status = 'paid'
-                    appointment.save()
-                else:
-                    appointment.status = 'failed'
-                    appointment.save()
-            except Appointment.DoesNotExist:
-                pass
-    elif event['type'] == 'checkout.session.async_payment_succeeded':
-        session = event['data']['object']
-        pass
-    elif event['type'] == 'checkout.session.async_payment_failed':
-        session = event['data']['object']
-        pass
+    # Store the event and acknowledge immediately; process_stripe_events
+    # applies the status changes in batches.
+    record_event(json.loads(payload))
 
     return HttpResponse(status=200)
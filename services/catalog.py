@@ -0,0 +1,142 @@
+# services/catalog.py
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+
+_snapshot = None
+_lock = threading.Lock()
+
+# The last version read from the database and when (time.monotonic()).
+_version = None
+_version_checked_at = 0.0
+
+
+def _version_is_fresh():
+    return _version is not None and time.monotonic() - _version_checked_at < settings.CATALOG_VERSION_CHECK_SECONDS
+
+
+def _remember_version(version):
+    global _version, _version_checked_at
+    _version, _version_checked_at = version, time.monotonic()
+    return version
+
+
+def _read_version():
+    from .models import CatalogVersion
+    version = CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+    if version is None:
+        # Seeded from the clock, so a recreated table never reuses an old ETag.
+        version = CatalogVersion.objects.get_or_create(pk=1, defaults={'version': time.time_ns()})[0].version
+    return version
+
+
+def get_catalog_version():
+    """
+    A counter bumped whenever a category, subcategory, service or location
+    changes. It is kept in the database and re-read at most every
+    CATALOG_VERSION_CHECK_SECONDS, which bounds how long another worker's
+    change can go unseen.
+    """
+    if _version_is_fresh():
+        return _version
+    return _remember_version(_read_version())
+
+
+async def aget_catalog_version():
+    if _version_is_fresh():
+        return _version
+    from .models import CatalogVersion
+    version = await CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).afirst()
+    if version is None:
+        version = await sync_to_async(_read_version)()
+    return _remember_version(version)
+
+
+def bump_catalog_version():
+    global _version
+    from .models import CatalogVersion
+    if not CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        _read_version()
+    # This process sees its own change straight away.
+    _version = None
+
+
+class CatalogSnapshot:
+    """
+    Read-only copy of categories -> subcategories -> services, plus locations.
+    Lists are tuples in primary-key order and lookups are keyed by id; each
+    subcategory and service already has its parent attached, so templates can
+    follow category/sub_category without a query.
+    """
+
+    def __init__(self, version, categories, subcategories, services, locations):
+        self.version = version
+        self.categories = tuple(categories)
+        self.locations = tuple(locations)
+        self.category_by_id = {category.pk: category for category in self.categories}
+        self.subcategory_by_id = {}
+        self.location_by_id = {location.pk: location for location in self.locations}
+
+        by_category = {}
+        for subcategory in subcategories:
+            subcategory.category = self.category_by_id[subcategory.category_id]
+            self.subcategory_by_id[subcategory.pk] = subcategory
+            by_category.setdefault(subcategory.category_id, []).append(subcategory)
+        self._subcategories = {key: tuple(value) for key, value in by_category.items()}
+        self.subcategories = tuple(self.subcategory_by_id.values())
+
+        by_subcategory = {}
+        for service in services:
+            service.sub_category = self.subcategory_by_id[service.sub_category_id]
+            by_subcategory.setdefault(service.sub_category_id, []).append(service)
+        self._services = {key: tuple(value) for key, value in by_subcategory.items()}
+
+    @classmethod
+    def load(cls, version):
+        from providers.models import ServiceLocation
+        from .models import ServiceCategory, ServiceSubCategory, Service
+        return cls(
+            version,
+            ServiceCategory.objects.order_by('pk'),
+            ServiceSubCategory.objects.order_by('pk'),
+            Service.objects.order_by('pk'),
+            ServiceLocation.objects.order_by('pk'),
+        )
+
+    def subcategories_of(self, category_id):
+        return self._subcategories.get(category_id, ())
+
+    def services_of(self, subcategory_id):
+        return self._services.get(subcategory_id, ())
+
+
+def get_catalog():
+    """
+    Returns the process-local catalog snapshot, reloading it (four queries)
+    only when the shared catalog version has moved since it was built.
+    """
+    global _snapshot
+    version = get_catalog_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            # The version is read before loading, so a change that lands
+            # mid-load leaves this snapshot stale and the next call reloads it.
+            _snapshot = CatalogSnapshot.load(version)
+        return _snapshot
+
+
+async def aget_catalog():
+    """
+    Async get_catalog(). A current snapshot costs one version lookup; only a
+    reload runs the synchronous loader, in a worker thread.
+    """
+    version = await aget_catalog_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    return await sync_to_async(get_catalog)()
@@ -0,0 +1,132 @@
+# services/images.py
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+# Pillow format name and file extension for each derivative format.
+FORMATS = (('WEBP', 'webp'), ('JPEG', 'jpg'))
+
+# How long available_widths() results are cached: a finished set never
+# changes, while an image still waiting for its derivatives is rechecked soon.
+WIDTHS_CACHE_TIMEOUT = 24 * 60 * 60
+MISSING_WIDTHS_CACHE_TIMEOUT = 60
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def variant_name(name, width, extension):
+    """Storage name of a derivative, stored next to the original: foo.jpg -> foo.w640.webp"""
+    root, _ = os.path.splitext(name)
+    return f'{root}.w{width}.{extension}'
+
+
+def has_variants(name):
+    # The smallest JPEG is written last, so its presence means the set is complete.
+    return default_storage.exists(variant_name(name, min(settings.IMAGE_VARIANT_WIDTHS), 'jpg'))
+
+
+def generate_variants(name, force=False):
+    """
+    Writes every width/format derivative of the stored image `name` and
+    returns how many were written. Widths larger than the original are
+    skipped rather than upscaled.
+    """
+    from PIL import Image, ImageOps
+
+    if not force and has_variants(name):
+        return 0
+    with default_storage.open(name, 'rb') as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+    if original.mode not in ('RGB', 'L'):
+        original = original.convert('RGB')
+
+    written = 0
+    # Largest first, so has_variants() only reports a finished set.
+    for width in sorted(settings.IMAGE_VARIANT_WIDTHS, reverse=True):
+        if width > original.width and width != min(settings.IMAGE_VARIANT_WIDTHS):
+            continue
+        resized = original.copy()
+        resized.thumbnail((width, width * 4), Image.LANCZOS)
+        for image_format, extension in FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, quality=settings.IMAGE_VARIANT_QUALITY, optimize=True)
+            target = variant_name(name, width, extension)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+            written += 1
+    return written
+
+
+def _widths_cache_key(name):
+    # Storage names may hold characters that memcached keys cannot.
+    return 'image-widths:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def available_widths(name):
+    """
+    The generated widths of `name`, smallest first. Checking storage costs a
+    stat (or a HEAD request) per width, so results are cached; an image with
+    no finished set costs a single check.
+    """
+    key = _widths_cache_key(name)
+    widths = cache.get(key)
+    if widths is not None:
+        return widths
+    if has_variants(name):
+        widths = [
+            width for width in sorted(settings.IMAGE_VARIANT_WIDTHS)
+            if width == min(settings.IMAGE_VARIANT_WIDTHS) or default_storage.exists(variant_name(name, width, 'jpg'))
+        ]
+        cache.set(key, widths, WIDTHS_CACHE_TIMEOUT)
+    else:
+        widths = []
+        cache.set(key, widths, MISSING_WIDTHS_CACHE_TIMEOUT)
+    return widths
+
+
+def _init_worker():
+    # Spawned (non-forked) workers start without Django configured.
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _generate_in_worker(name, force):
+    try:
+        return generate_variants(name, force=force)
+    except Exception:
+        # A corrupt upload must not take the worker down; the original is still served.
+        logger.exception("Could not generate image variants for %s", name)
+        return 0
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: forking a threaded web process can copy held locks.
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def schedule_variants(name, force=False):
+    """Queues derivative generation for `name` on the image process pool."""
+    return get_pool().submit(_generate_in_worker, name, force)
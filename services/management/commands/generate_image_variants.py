@@ -0,0 +1,33 @@
+# services/management/commands/generate_image_variants.py
+from concurrent.futures import as_completed
+from django.core.management.base import BaseCommand
+from providers.models import ProviderService
+from services.images import get_pool, has_variants, schedule_variants
+from services.models import ServiceCategory, ServiceSubCategory
+
+
+class Command(BaseCommand):
+    help = "Generates resized WebP/JPEG derivatives for existing category, subcategory and service images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate derivatives that already exist.")
+
+    def handle(self, *args, **options):
+        names = set()
+        for model in (ServiceCategory, ServiceSubCategory, ProviderService):
+            names.update(
+                name for name in model.objects.exclude(image='').exclude(image__isnull=True)
+                .values_list('image', flat=True).iterator(chunk_size=2000)
+            )
+        if not options['force']:
+            names = {name for name in names if not has_variants(name)}
+
+        futures = [schedule_variants(name, force=options['force']) for name in sorted(names)]
+        written = processed = 0
+        for future in as_completed(futures):
+            written += future.result()
+            processed += 1
+            if processed % 100 == 0:
+                self.stdout.write(f"{processed}/{len(futures)} images processed...")
+        get_pool().shutdown()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} derivatives for {len(futures)} images."))
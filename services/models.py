@@ -33,3 +33,11 @@ class Service(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.sub_category.name})"
+
+
+class CatalogVersion(models.Model):
+    """
+    A single row holding the catalog change counter. It lives in the database
+    so every worker process sees a bump, whatever cache backend is configured.
+    """
+    version = models.BigIntegerField()
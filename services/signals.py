@@ -0,0 +1,26 @@
+# services/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .catalog import bump_catalog_version
+from .images import has_variants, schedule_variants
+from .models import ServiceCategory, ServiceSubCategory, Service
+
+
+@receiver([post_save, post_delete], sender=ServiceCategory)
+@receiver([post_save, post_delete], sender=ServiceSubCategory)
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender='providers.ServiceLocation')
+def invalidate_catalog(sender, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_save, sender=ServiceSubCategory)
+@receiver(post_save, sender='providers.ProviderService')
+def generate_image_variants(sender, instance, **kwargs):
+    # Thumbnails are resized in the image process pool once the upload is committed.
+    if not instance.image:
+        return
+    name = instance.image.name
+    transaction.on_commit(lambda: has_variants(name) or schedule_variants(name))
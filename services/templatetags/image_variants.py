@@ -0,0 +1,43 @@
+# services/templatetags/image_variants.py
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+from services.images import available_widths, variant_name
+
+register = template.Library()
+
+# Listing cards are a third of the row on large screens and half on tablets.
+CARD_SIZES = '(min-width: 992px) 33vw, (min-width: 768px) 50vw, 100vw'
+
+
+def _srcset(name, widths, extension):
+    return ', '.join(f'{default_storage.url(variant_name(name, width, extension))} {width}w' for width in widths)
+
+
+@register.simple_tag
+def image_srcset(image, extension='jpg'):
+    """The srcset for an image's derivatives, or '' if none have been generated yet."""
+    if not image:
+        return ''
+    return _srcset(image.name, available_widths(image.name), extension)
+
+
+@register.simple_tag
+def picture(image, alt='', css_class='', style='', sizes=CARD_SIZES):
+    """
+    Renders a <picture> offering WebP and JPEG derivatives at every generated
+    width, falling back to the original upload until the derivatives exist.
+    """
+    if not image:
+        return ''
+    widths = available_widths(image.name)
+    if not widths:
+        return format_html('<img src="{}" class="{}" alt="{}" style="{}" loading="lazy">', image.url, css_class, alt, style)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" alt="{}" style="{}" loading="lazy" decoding="async"></picture>',
+        _srcset(image.name, widths, 'webp'), sizes,
+        default_storage.url(variant_name(image.name, widths[0], 'jpg')),
+        _srcset(image.name, widths, 'jpg'), sizes,
+        css_class, alt, style,
+    )
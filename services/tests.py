@@ -1,3 +1,50 @@
-from django.test import TestCase
+# services/tests.py
+from unittest import mock
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from . import catalog, images
+from .models import CatalogVersion, ServiceCategory
 
-# Create your tests here.
+
+@override_settings(CATALOG_VERSION_CHECK_SECONDS=5)
+class CatalogVersionTests(TestCase):
+    def setUp(self):
+        catalog._version = None
+
+    def test_a_bump_by_another_process_is_seen_after_the_check_interval(self):
+        with mock.patch('services.catalog.time.monotonic', return_value=1000.0):
+            version = catalog.get_catalog_version()
+            # Another worker edits the catalog; only the database row changes.
+            CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1)
+            self.assertEqual(catalog.get_catalog_version(), version)
+        with mock.patch('services.catalog.time.monotonic', return_value=1006.0):
+            self.assertEqual(catalog.get_catalog_version(), version + 1)
+
+    def test_a_local_edit_reloads_the_snapshot_at_once(self):
+        catalog.get_catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            category = ServiceCategory.objects.create(name='Wellness')
+        self.assertIn(category.pk, catalog.get_catalog().category_by_id)
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=(320, 640, 1280))
+class AvailableWidthsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_storage_is_checked_once_per_image(self):
+        with mock.patch('services.images.default_storage.exists', return_value=True) as exists:
+            self.assertEqual(images.available_widths('services/a.jpg'), [320, 640, 1280])
+            self.assertEqual(images.available_widths('services/a.jpg'), [320, 640, 1280])
+        self.assertEqual(exists.call_count, 3)
+
+    def test_missing_variants_cost_one_check(self):
+        with mock.patch('services.images.default_storage.exists', return_value=False) as exists:
+            self.assertEqual(images.available_widths('services/b.jpg'), [])
+        self.assertEqual(exists.call_count, 1)
+
+    def test_worker_failures_are_logged(self):
+        with mock.patch('services.images.generate_variants', side_effect=OSError('truncated file')):
+            with self.assertLogs('services.images', 'ERROR'):
+                self.assertEqual(images._generate_in_worker('services/c.jpg', False), 0)